@@ -1,275 +1,283 @@
 from gameobjects import GameObject
-from move import Move
-from move import Direction
+from move import Direction, turn_moves, xy_manipulations
+from collections import deque
 import heapq
-import math
 from board import Board
-import time
+from gridstate import FOOD, SNAKE_HEAD
+
+""" BEGIN AGENT SETTINGS """
+# Pathfinding engine: "astar" for AStar or "jps" for the JumpPointSearch of jps.py, which is faster on open boards
+pathfinding_engine = "astar"
+""" END AGENT SETTINGS """
+
+
+def make_engine(name, board_width, board_height):
+    """ :return: The pathfinding engine with the given name, sized to the board. """
+    if name == "jps":
+        # jps.py builds on AStar, so it can only be imported once this module is loaded
+        from jps import JumpPointSearch
+        return JumpPointSearch(board_width, board_height)
+    if name == "astar":
+        return AStar(board_width, board_height)
+    raise ValueError("unknown pathfinding engine: {}".format(name))
+
 
 class Agent:
     def __init__(self, board_width, board_height):
         self.board_width = board_width
         self.board_height = board_height
-        self.times = []
-
-    def update_time(self, t):
-        self.times.append(t)
-        if len(self.times) == 30:
-            print("measuring done")
-            total = 0
-            for t in self.times:
-                total += t
-            print("mean is: " + str(total / 30))
+        # the search arena is sized to the board once and reused every turn
+        self.aStar = make_engine(pathfinding_engine, board_width, board_height)
 
     def get_move(self, board: Board, score, turns_alive, turns_to_starve, direction):
-        aStar = AStar(board, direction, self.board_width, self.board_height)
-        aStar.init_grid()
-        start = time.time()
-        result = aStar.process()
-        end = time.time()
-        t = end - start
-        print(t)
-        self.update_time(t)
-        return None
+        self.aStar.load(board, direction)
+        return self.aStar.process()
 
     def on_die(self):
-        pass
-
-class Cell(object):
-    def __init__(self, x, y, reachable):
-        self.reachable = reachable
-        self.x = x
-        self.y = y
-        self.parent = None
-        self.g = 0
-        self.h = 0
-        self.f = 0
+        self.aStar.forget_path()
 
-    def __lt__(self, other):
-        return self.f < other.f
+class AStar(object):
+    """
+    A* search over the board. The state of every cell lives in flat arrays indexed by x * grid_height + y, which are
+    allocated once for the board size and reused for every search. The g, f and parent of a cell are only valid when
+    its stamp equals the current generation, so a new search starts by increasing the generation instead of resetting
+    all cells.
 
-    def __str__(self):
-        return "x: " + str(self.x) + " y: " + str(self.y)
+    The path of a search is kept and followed on the next turns, as long as it is still valid, instead of searching
+    again every turn.
+    """
 
-class AStar(object):
-    def __init__(self, board: Board, currDir: Direction, board_width, board_height):
+    def __init__(self, grid_width, grid_height):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        size = grid_width * grid_height
+        self.reachable = [False] * size
+        self.goal = [False] * size
+        self.g = [0] * size
+        self.f = [0] * size
+        self.parent = [-1] * size
+        # generation in which g, f and parent of a cell were set
+        self.stamp = [0] * size
+        # generation in which a cell was closed
+        self.closed = [0] * size
+        self.generation = 0
+        # size of the region of every open neighbor of the head, see update_regions
+        self.region = {}
         self.opened = []
-        heapq.heapify(self.opened)
-        self.closed = set()
-        self.cells = []
-        self.grid_height = board_width
-        self.grid_width = board_height
-        self.board = board
-        self.currDir = currDir
+        self.board = None
+        self.currDir = None
         self.ends = []
+        self.end_xys = []
         self.end = None
-        self.distance = math.inf
         self.start = None
+        # path being followed: the cells still to walk with the next one last, the cell the head should be on, and the
+        # food blocks on the board when it was found
+        self.path = []
+        self.path_head = None
+        self.path_ends = set()
 
-    def init_grid(self):
+    def load(self, board, currDir: Direction):
+        state = getattr(board, 'state', None)
+        if state is not None:
+            self.load_state(state, currDir)
+            return
+        self.board = board
+        self.currDir = currDir
+        self.ends = []
+        reachable = self.reachable
+        goal = self.goal
         for x in range(self.grid_width):
+            column = board[x]
+            offset = x * self.grid_height
             for y in range(self.grid_height):
-                if self.board[x][y] == GameObject.WALL \
-                   or self.board[x][y] == GameObject.SNAKE_BODY:
-                    reachable = False
-                else:
-                    reachable = True
-                self.cells.append(Cell(x, y, reachable))
-                if self.board[x][y] == GameObject.SNAKE_HEAD:
-                    self.start = self.get_cell(x, y)
-                if self.board[x][y] == GameObject.FOOD:
-                    self.ends.append(self.get_cell(x, y))
-
-    def find_nearest(self):
-        for cell in self.ends:
-            new_distance = abs(cell.x - self.start.x) + abs(cell.y - self.start.y)
-            if new_distance < self.distance:
-                self.end = cell
-                self.distance = new_distance
-        self.ends.remove(cell)
+                game_object = column[y]
+                reachable[offset + y] = not (game_object == GameObject.WALL or game_object == GameObject.SNAKE_BODY)
+                goal[offset + y] = game_object == GameObject.FOOD
+                if game_object == GameObject.SNAKE_HEAD:
+                    self.start = offset + y
+                elif game_object == GameObject.FOOD:
+                    self.ends.append(offset + y)
+        self.end_xys = [self.get_xy(end) for end in self.ends]
+
+    def load_state(self, state, currDir: Direction):
+        """
+        Same as load, but reads the bytes of the ReadOnlyGridState of a BoardView, which use the same cell numbering as
+        the arrays here.
+        """
+        self.board = state
+        self.currDir = currDir
+        self.reachable = state.translate((GameObject.WALL, GameObject.SNAKE_BODY), 0, 1)
+        self.goal = state.mask(GameObject.FOOD)
+        self.start = state.find(SNAKE_HEAD)
+        self.ends = []
+        end = state.find(FOOD)
+        while end != -1:
+            self.ends.append(end)
+            end = state.find(FOOD, end + 1)
+        self.end_xys = [self.get_xy(end) for end in self.ends]
 
     def get_heuristic(self, cell):
-        return 10 * (abs(cell.x - self.end.x) + abs(cell.y - self.end.y))
+        # distance to the nearest food block, which never overestimates the distance to the food that is reached
+        x, y = self.get_xy(cell)
+        return 10 * min([abs(x - end_x) + abs(y - end_y) for end_x, end_y in self.end_xys])
 
     def get_cell(self, x, y):
         if -1 < x < self.grid_width and -1 < y < self.grid_height:
-            return self.cells[x * self.grid_height + y]
+            return x * self.grid_height + y
         else:
             return None
 
+    def get_xy(self, cell):
+        return divmod(cell, self.grid_height)
+
     def coor_to_dir(self, cell, target):
-        if cell.y - target.y > 0:
-            ##print("cell x:" + str(cell.x) + " cell y: " + str(cell.y))
-            ##print("target x:" + str(target.x) + "target y:" + str(target.y))
+        cell_x, cell_y = self.get_xy(cell)
+        target_x, target_y = self.get_xy(target)
+        if cell_y - target_y > 0:
             return Direction.NORTH
-        elif cell.x - target.x < 0:
-            ##print("cell x:" + str(cell.x) + " cell y: " + str(cell.y))
-            ##print("target x:" + str(target.x) + "target y:" + str(target.y))
+        elif cell_x - target_x < 0:
             return Direction.EAST
-        elif cell.y - target.y < 0:
-            ##print("cell x:" + str(cell.x) + " cell y: " + str(cell.y))
-            ##print("target x:" + str(target.x) + "target y:" + str(target.y))
+        elif cell_y - target_y < 0:
             return Direction.SOUTH
         else:
-            ##print("cell x:" + str(cell.x) + " cell y: " + str(cell.y))
-            ##print("target x:" + str(target.x) + "target y:" + str(target.y))
             return Direction.WEST
 
     def dir_to_move(self, targetDir):
-        if self.currDir == Direction.WEST:
-            if targetDir == Direction.NORTH:
-                return Move.RIGHT
-            elif targetDir == Direction.SOUTH:
-                return Move.LEFT
-            elif targetDir == Direction.EAST:
-                #print("going back!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-                return Move.LEFT
-        elif self.currDir == Direction.NORTH:
-            if targetDir == Direction.WEST:
-                return Move.LEFT
-            elif targetDir == Direction.EAST:
-                return Move.RIGHT
-            elif targetDir == Direction.SOUTH:
-                #print("going back!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-                return Move.LEFT
-        elif self.currDir == Direction.EAST:
-            if targetDir == Direction.NORTH:
-                return Move.LEFT
-            elif targetDir == Direction.SOUTH:
-                return Move.RIGHT
-            elif targetDir == Direction.WEST:
-                #print("going back!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-                return Move.LEFT
-        else:
-            if targetDir == Direction.WEST:
-                return Move.RIGHT
-            elif targetDir == Direction.EAST:
-                return Move.LEFT
-            elif targetDir == Direction.NORTH:
-                #print("going back!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-                return Move.LEFT
-        return Move.STRAIGHT
+        # turning around is not possible, a move to the opposite direction is a move left
+        return turn_moves[self.currDir._value_][targetDir._value_]
 
     def get_open_neighbors(self, cell):
-        x = cell.x
-        y = cell.y
-        N = y - 1
-        S = y + 1
-        E = x + 1
-        W = x - 1
-        openN = self.walkable(x, N)
-        openS = self.walkable(x, S)
-        openE = self.walkable(E, y)
-        openW = self.walkable(W, y)
+        x, y = self.get_xy(cell)
         result = []
-        if openN:
-            result.append(self.get_cell(x, N))
-        if openS:
-            result.append(self.get_cell(x, S))
-        if openE:
-            result.append(self.get_cell(E, y))
-        if openW:
-            result.append(self.get_cell(W, y))
+        for n_x, n_y in ((x, y - 1), (x, y + 1), (x + 1, y), (x - 1, y)):
+            if self.walkable(n_x, n_y):
+                result.append(n_x * self.grid_height + n_y)
         return result
 
     def get_all_neighbors(self, cell):
-        x = cell.x
-        y = cell.y
-        N = y - 1
-        S = y + 1
-        E = x + 1
-        W = x - 1
-        openN = self.walkable(x, N)
-        openS = self.walkable(x, S)
-        openE = self.walkable(E, y)
-        openW = self.walkable(W, y)
-        if openN:
-            NCell = self.get_cell(x, N)
-        else:
-            NCell = None
-        if openS:
-            SCell = self.get_cell(x, S)
-        else:
-            SCell = None
-        if openE:
-            ECell = self.get_cell(E, y)
-        else:
-            ECell = None
-        if openW:
-            WCell = self.get_cell(W, y)
-        else:
-            WCell = None
+        x, y = self.get_xy(cell)
         result = []
-        result.append({'cell': NCell, 'open': openN, 'z': self.get_consecutive(NCell, Direction.NORTH)})
-        result.append({'cell': ECell, 'open': openE, 'z': self.get_consecutive(ECell, Direction.EAST)})
-        result.append({'cell': SCell, 'open': openS, 'z': self.get_consecutive(SCell, Direction.SOUTH)})
-        result.append({'cell': WCell, 'open': openW, 'z': self.get_consecutive(WCell, Direction.WEST)})
+        for direction, n_x, n_y in ((Direction.NORTH, x, y - 1), (Direction.EAST, x + 1, y),
+                                    (Direction.SOUTH, x, y + 1), (Direction.WEST, x - 1, y)):
+            open = self.walkable(n_x, n_y)
+            n_cell = self.get_cell(n_x, n_y) if open else None
+            result.append({'cell': n_cell, 'open': open, 'z': self.get_consecutive(n_cell, direction),
+                           'region': self.get_region(n_cell)})
         return result
 
+    def update_regions(self):
+        """
+        Measures the regions move_safe compares: for every open neighbor of the head, the number of walkable cells that
+        can be reached from it without passing the head.
+
+        A breadth first search runs from every neighbor, in lockstep with one cell per region per round, and the regions
+        are joined when their searches meet. Counting stops as soon as the order of the regions is known: when all
+        neighbors turn out to be in one region, or when the only region still growing is larger than every finished
+        one. Only that largest region can be counted short, so the cost is bounded by the smaller regions instead of
+        the board.
+        """
+        height = self.grid_height
+        size = self.grid_width * height
+        reachable = self.reachable
+        neighbors = self.get_open_neighbors(self.start)
+        self.region = {}
+        if len(neighbors) < 2:
+            self.region = {neighbor: 1 for neighbor in neighbors}
+            return
+        # label of the search that reached a cell, 0 for none and 255 for the head
+        labels = bytearray(size)
+        labels[self.start] = 255
+        roots = list(range(len(neighbors) + 1))
+        queues = [None] + [deque([neighbor]) for neighbor in neighbors]
+        counts = [0] + [1] * len(neighbors)
+        for label, neighbor in enumerate(neighbors, 1):
+            labels[neighbor] = label
+
+        def find(label):
+            while roots[label] != label:
+                label = roots[label]
+            return label
+
+        changed = True
+        while True:
+            if changed:
+                changed = False
+                # the labels with cells left to visit per region
+                growing = {}
+                for label in range(1, len(queues)):
+                    root = find(label)
+                    growing.setdefault(root, [])
+                    if len(queues[label]) > 0:
+                        growing[root].append(label)
+                finished = [counts[root] for root in growing if len(growing[root]) == 0]
+                growing = {root: active for root, active in growing.items() if len(active) > 0}
+                if len(finished) + len(growing) == 1 or len(growing) == 0:
+                    break
+            # the region still growing is the largest one once it passes the finished ones
+            if len(growing) == 1 and counts[next(iter(growing))] > max(finished):
+                break
+            for active in growing.values():
+                label = active[0]
+                queue = queues[label]
+                cell = queue.popleft()
+                y = cell % height
+                for n, inside in ((cell - 1, y > 0), (cell + 1, y < height - 1), (cell - height, cell >= height),
+                                  (cell + height, cell + height < size)):
+                    if inside and reachable[n]:
+                        other = labels[n]
+                        if other == 0:
+                            labels[n] = label
+                            queue.append(n)
+                            counts[find(label)] += 1
+                        elif other != 255:
+                            root, other_root = find(label), find(other)
+                            if root != other_root:
+                                roots[other_root] = root
+                                counts[root] += counts[other_root]
+                                changed = True
+                if len(queue) == 0:
+                    changed = True
+        for label, neighbor in enumerate(neighbors, 1):
+            self.region[neighbor] = counts[find(label)]
+
     def get_consecutive(self, cell, direction: Direction):
-        counter = 0
-        currCell = cell
-        if currCell is None:
+        if cell is None:
             return 0
-        if direction == Direction.NORTH:
-            while currCell is not None and currCell.reachable:
-                counter += 1
-                currCell = self.get_cell(currCell.x, currCell.y - 1)
-        elif direction == Direction.SOUTH:
-            while currCell is not None and currCell.reachable:
-                counter += 1
-                currCell = self.get_cell(currCell.x, currCell.y + 1)
-        elif direction == Direction.EAST:
-            while currCell is not None and currCell.reachable:
-                counter += 1
-                currCell = self.get_cell(currCell.x + 1, currCell.y)
-        elif direction == Direction.WEST:
-            while currCell is not None and currCell.reachable:
-                counter += 1
-                currCell = self.get_cell(currCell.x - 1, currCell.y)
+        man_x, man_y = xy_manipulations[direction._value_]
+        x, y = self.get_xy(cell)
+        counter = 0
+        while self.walkable(x, y):
+            counter += 1
+            x += man_x
+            y += man_y
         return counter
 
+    def get_region(self, cell):
+        if cell is None:
+            return 0
+        return self.region[cell]
+
     def walkable(self, x, y):
-        cell = self.get_cell(x, y)
-        if cell is not None:
-            return cell.reachable
+        if -1 < x < self.grid_width and -1 < y < self.grid_height:
+            return self.reachable[x * self.grid_height + y]
         else:
             return False
 
     def check_chute(self, cell, direction: Direction):
-        currCell = cell
-        if direction == Direction.NORTH:
-            while self.grid_height > currCell.y > -1 and self.grid_width > currCell.x > -1\
-                  and not self.walkable(currCell.x - 1, currCell.y) and not self.walkable(currCell.x + 1, currCell.y):
-                if not self.walkable(currCell.x, currCell.y - 1):
-                    return True
-                else:
-                    currCell = self.get_cell(currCell.x, currCell.y - 1)
-        elif direction == Direction.SOUTH:
-            while self.grid_height > currCell.y > -1 and self.grid_width > currCell.x > -1\
-                  and not self.walkable(currCell.x - 1, currCell.y) and not self.walkable(currCell.x + 1, currCell.y):
-                if not self.walkable(currCell.x, currCell.y + 1):
-                    return True
-                else:
-                    currCell = self.get_cell(currCell.x, currCell.y + 1)
-        elif direction == Direction.EAST:
-            while self.grid_height > currCell.y > -1 and self.grid_width > currCell.x > -1\
-                  and not self.walkable(currCell.x, currCell.y - 1) and not self.walkable(currCell.x, currCell.y + 1):
-                if not self.walkable(currCell.x + 1, currCell.y):
-                    return True
-                else:
-                    currCell = self.get_cell(currCell.x + 1, currCell.y)
-        elif direction == Direction.WEST:
-            while self.grid_height > currCell.y > -1 and self.grid_width > currCell.x > -1\
-                  and not self.walkable(currCell.x, currCell.y - 1) and not self.walkable(currCell.x, currCell.y + 1):
-                if not self.walkable(currCell.x - 1, currCell.y):
-                    return True
-                else:
-                    currCell = self.get_cell(currCell.x - 1, currCell.y)
+        man_x, man_y = xy_manipulations[direction._value_]
+        x, y = self.get_xy(cell)
+        # walk along the direction as long as both sides are closed, a dead end at the end makes it a chute
+        while self.grid_height > y > -1 and self.grid_width > x > -1 \
+                and not self.walkable(x - man_y, y - man_x) and not self.walkable(x + man_y, y + man_x):
+            if not self.walkable(x + man_x, y + man_y):
+                return True
+            else:
+                x += man_x
+                y += man_y
         return False
 
     def move_safe(self):
-        #print("safe move")
+        self.update_regions()
         ns = self.get_all_neighbors(self.start)
         if not ns[0].get('open') and not ns[2].get('open') and ns[1].get('open') and ns[3].get('open'):
             if ns[3].get('z') > ns[1].get('z') and not self.check_chute(ns[3].get('cell'), Direction.WEST):
@@ -282,81 +290,104 @@ class AStar(object):
             else:
                 return self.dir_to_move(Direction.NORTH)
         else:
-            #print(ns)
-            sortedList = sorted(ns, key=lambda k: k['z'], reverse=True)
-            #print(sortedList)
-            if sortedList[0].get('open') and not self.check_chute(sortedList[0].get('cell'), self.coor_to_dir(self.start, sortedList[0].get('cell'))):
-                return self.dir_to_move(self.coor_to_dir(self.start, sortedList[0].get('cell')))
-            elif sortedList[1].get('open') and not self.check_chute(sortedList[1].get('cell'), self.coor_to_dir(self.start, sortedList[1].get('cell'))):
-                return self.dir_to_move(self.coor_to_dir(self.start, sortedList[1].get('cell')))
-            elif sortedList[2].get('open') and not self.check_chute(sortedList[2].get('cell'), self.coor_to_dir(self.start, sortedList[2].get('cell'))):
-                return self.dir_to_move(self.coor_to_dir(self.start, sortedList[2].get('cell')))
-            elif sortedList[3].get('open') and not self.check_chute(sortedList[3].get('cell'), self.coor_to_dir(self.start, sortedList[3].get('cell'))):
-                return self.dir_to_move(self.coor_to_dir(self.start, sortedList[3].get('cell')))
-            #if ns[0].get('open') and not self.check_chute(ns[0].get('cell'), Direction.NORTH):
-            #    return self.dir_to_move(Direction.NORTH)
-            #elif ns[1].get('open') and not self.check_chute(ns[1].get('cell'), Direction.EAST):
-            #    return self.dir_to_move(Direction.EAST)
-            #elif ns[2].get('open') and not self.check_chute(ns[2].get('cell'), Direction.SOUTH):
-            #    return self.dir_to_move(Direction.SOUTH)
-            #elif ns[3].get('open') and not self.check_chute(ns[3].get('cell'), Direction.WEST):
-            #    return self.dir_to_move(Direction.WEST)
-            else:
-                ns = self.get_open_neighbors(self.start)
-                if len(ns) > 0:
-                    return self.dir_to_move(self.coor_to_dir(self.start, ns[0]))
+            # prefer the largest region that stays reachable, then the longest straight line
+            sortedList = sorted(ns, key=lambda k: (k['region'], k['z']), reverse=True)
+            for n in sortedList:
+                if n.get('open'):
+                    direction = self.coor_to_dir(self.start, n.get('cell'))
+                    if not self.check_chute(n.get('cell'), direction):
+                        return self.dir_to_move(direction)
+            ns = self.get_open_neighbors(self.start)
+            if len(ns) > 0:
+                return self.dir_to_move(self.coor_to_dir(self.start, ns[0]))
 
     def next_move(self):
-        #print("path")
+        """ Takes the next cell of the path and moves towards it. """
+        self.path_head = self.path.pop()
+        return self.dir_to_move(self.coor_to_dir(self.start, self.path_head))
+
+    def store_path(self):
+        """ Stores the path found by the last search, from the food block back to the cell after the head. """
+        self.path = []
         cell = self.end
-        while cell.parent is not self.start:
-            #print(cell)
-            cell = cell.parent
-        #print(cell)
-        #print(cell.parent)
-        return self.dir_to_move(self.coor_to_dir(self.start, cell))
+        while cell != self.start:
+            self.path.append(cell)
+            cell = self.parent[cell]
+        self.path_ends = set(self.ends)
+
+    def forget_path(self):
+        self.path = []
+        self.path_head = None
+
+    def path_valid(self):
+        """
+        Checks whether the rest of the path of a previous search can be followed instead of searching again.
+
+        :return: False when there is no path, the head is not where the path led it, the food block at the end is
+        gone, a food block that appeared since may be closer than the end of the path, or a cell on the rest of the
+        path is blocked.
+        """
+        if len(self.path) == 0 or self.start != self.path_head or not self.goal[self.path[0]]:
+            return False
+        start_x, start_y = self.get_xy(self.start)
+        for end in self.ends:
+            if end not in self.path_ends:
+                end_x, end_y = self.get_xy(end)
+                if abs(start_x - end_x) + abs(start_y - end_y) < len(self.path):
+                    return False
+        return all(map(self.reachable.__getitem__, self.path))
 
     def update_cell(self, adj, cell):
-        adj.g = cell.g + 10
-        adj.h = self.get_heuristic(adj)
-        adj.parent = cell
-        adj.f = adj.h + adj.g
+        self.stamp[adj] = self.generation
+        self.g[adj] = self.g[cell] + 10
+        self.f[adj] = self.g[adj] + self.get_heuristic(adj)
+        self.parent[adj] = cell
 
-    def process(self):
-        self.opened = []
-        self.find_nearest()
+    def search(self):
+        """
+        Runs A* from the head towards all food blocks at once, in a new generation of the arena. The search ends at
+        the first food block taken from the open list, which is the nearest reachable one.
+
+        :return: True if a food block was reached, it is stored in self.end and the path can be followed back through
+        self.parent.
+        """
+        self.generation += 1
+        generation = self.generation
+        self.stamp[self.start] = generation
+        self.g[self.start] = 0
+        self.f[self.start] = self.get_heuristic(self.start)
+        self.parent[self.start] = -1
         # add starting cell to open heap queue
-        heapq.heappush(self.opened, self.start)
+        self.opened = [(self.f[self.start], self.start)]
         while len(self.opened) > 0:
             # pop cell from heap queue
-            cell = heapq.heappop(self.opened)
-            # add cell to closed list so we don't process it twice
-            self.closed.add(cell)
-            # if ending cell, return next move
-            if cell is self.end:
-                return self.next_move()
+            f, cell = heapq.heappop(self.opened)
+            # a cell is pushed again when a better path to it is found, the entries with its old f are left in the
+            # heap and skipped here once the cell is closed
+            if self.closed[cell] == generation:
+                continue
+            # close cell so we don't process it twice
+            self.closed[cell] = generation
+            # if ending cell, a path is found
+            if self.goal[cell]:
+                self.end = cell
+                return True
             # get adjacent cells for cell
-            adj_cells = self.get_open_neighbors(cell)
-            for adj_cell in adj_cells:
-                if adj_cell not in self.closed:
-                    if adj_cell in self.opened:
-                        # if adj cell in open list, check if current path is
-                        # better than the one previously found for this adj
-                        # cell
-                        if adj_cell.g > cell.g + 10:
-                            self.update_cell(adj_cell, cell)
-                    else:
+            g = self.g[cell] + 10
+            for adj_cell in self.get_open_neighbors(cell):
+                if self.closed[adj_cell] != generation:
+                    # a cell stamped in this generation but not closed is in the open list, only push it again
+                    # if the current path is better than the one previously found for it
+                    if self.stamp[adj_cell] != generation or self.g[adj_cell] > g:
                         self.update_cell(adj_cell, cell)
-                        # add adj cell to open list
-
-                        heapq.heappush(self.opened, adj_cell)
-        if len(self.ends) > 0:
-            for cell in self.cells:
-                cell.g = 0
-                cell.h = 0
-                cell.f = 0
-                cell.parent = None
-            return self.process()
-        else:
-            ##print("could not find path to food")
-            return self.move_safe()
+                        heapq.heappush(self.opened, (self.f[adj_cell], adj_cell))
+        return False
+
+    def process(self):
+        if self.path_valid():
+            return self.next_move()
+        self.forget_path()
+        if len(self.ends) > 0 and self.search():
+            self.store_path()
+            return self.next_move()
+        return self.move_safe()
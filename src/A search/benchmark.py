@@ -0,0 +1,206 @@
+"""
+Reproducible pathfinding benchmark. Every case builds a board from a fixed seed, so the same states are timed on every
+run, and compares the time per call with a stored baseline. Run "python benchmark.py --save-baseline" once on the
+machine used for comparing, after that "python benchmark.py" exits with status 1 when a case got slower than the
+baseline allows.
+
+A single call of a small case takes only microseconds, so every sample times a loop of calls that is long enough to
+rise above the resolution and jitter of the clock, with the garbage collector disabled like timeit does. The samples
+are taken in rounds over all cases, so a slow moment of the machine hits a single sample of many cases instead of
+every sample of a few. The fastest sample is the least disturbed, a case fails when its fastest sample is slower than
+the fastest sample of the baseline plus the tolerance and the spread of the samples of both runs.
+"""
+from collections import namedtuple
+from statistics import median
+from timeit import Timer
+import argparse
+import json
+import random
+import sys
+import zlib
+
+from agent import AStar
+from jps import JumpPointSearch
+from gameobjects import GameObject
+from move import Direction
+import headless
+
+Case = namedtuple('Case', ['operation', 'size', 'walls', 'food', 'length', 'seed'])
+
+""" BEGIN BENCHMARK SETTINGS """
+sizes = [10, 25, 50, 100, 200]
+# board sizes and food counts on which the process of AStar and JumpPointSearch are compared. There are only a few
+# food blocks, like in the game, so the paths are long
+jps_sizes = [100, 200]
+jps_food_counts = [1, 3]
+# wall and food counts are per 100 cells, so the density stays the same over the board sizes
+wall_densities = [0, 5, 20]
+food_densities = [0.5, 5]
+# snake lengths as a fraction of the number of cells
+snake_lengths = [0, 0.1, 0.3]
+# number of rounds over all cases, every round takes a sample per case that times as many calls as fit in 0.2 seconds
+repeat = 5
+# a case fails when its fastest sample is this much slower than the baseline, on top of the spread of the samples, 0.1
+# means 10%
+tolerance = 0.1
+baseline_file = "benchmark_baseline.json"
+""" END BENCHMARK SETTINGS """
+
+
+def make_cases(seed=0):
+    cases = []
+    for operation in ('process', 'move_safe'):
+        for size in sizes:
+            cells = size * size
+            for walls in wall_densities:
+                for food in food_densities:
+                    for length in snake_lengths:
+                        cases.append(Case(operation, size, int(cells * walls / 100), max(1, int(cells * food / 100)),
+                                          int(cells * length), seed))
+    for operation in ('process', 'jps'):
+        for size in jps_sizes:
+            cells = size * size
+            for walls in wall_densities:
+                for food in jps_food_counts:
+                    for length in snake_lengths:
+                        cases.append(Case(operation, size, int(cells * walls / 100), food, int(cells * length), seed))
+    return cases
+
+
+def case_name(case):
+    return "{}/{}x{}/walls={}/food={}/length={}/seed={}".format(case.operation, case.size, case.size, case.walls,
+                                                                case.food, case.length, case.seed)
+
+
+def grow_snake(snake, board, length, rng):
+    """
+    Lays a body of at most length parts behind the head along a random self avoiding walk. The walk stops early when
+    it runs into a dead end. The snake faces away from its first body part.
+    """
+    x, y = snake.x, snake.y
+    while len(snake.body_parts) < length:
+        options = [(x + man_x, y + man_y) for man_x, man_y in ((0, -1), (1, 0), (0, 1), (-1, 0))
+                   if 0 <= x + man_x < board.width and 0 <= y + man_y < board.height
+                   and board.board[x + man_x][y + man_y] == GameObject.EMPTY]
+        if len(options) == 0:
+            break
+        x, y = options[rng.randint(0, len(options) - 1)]
+        board.set_game_object_at(x, y, GameObject.SNAKE_BODY)
+        snake.body_parts.append((x, y))
+        snake.body_set.add((x, y))
+    if len(snake.body_parts) > 0:
+        body_x, body_y = snake.body_parts[0]
+        for direction in Direction:
+            if direction.get_xy_manipulation() == (snake.x - body_x, snake.y - body_y):
+                snake.direction = direction
+
+
+def make_state(case):
+    """ Builds the snake and board of a case. The same case always gives the same state. """
+    snake, board = headless.new_game(case.size, case.size, case.food, case.walls, False, -1, seed=case.seed)
+    grow_snake(snake, board, case.length, random.Random(case.seed))
+    return snake, board
+
+
+def fingerprint(board):
+    """ Checksum of the board, used to make sure a baseline was measured on the same states. """
+    return zlib.crc32(bytes(game_object.value for column in board.board for game_object in column))
+
+
+def prepare_case(case):
+    """
+    Builds the state of a case and a timer of its operation.
+
+    :return: A tuple (timer, number, fingerprint) with the number of calls per sample picked by autorange.
+    """
+    snake, board = make_state(case)
+    aStar = (JumpPointSearch if case.operation == 'jps' else AStar)(board.width, board.height)
+    aStar.load(board.get_view(), snake.direction)
+    # the head does not move between the calls, so process searches again every time instead of following its path
+    operation = aStar.move_safe if case.operation == 'move_safe' else aStar.process
+    timer = Timer(operation)
+    # autorange also warms up, it starts with a single call
+    number, _ = timer.autorange()
+    return timer, number, fingerprint(board)
+
+
+def time_cases(cases, repeat):
+    """
+    Takes repeat samples of every case, one per case in every round.
+
+    :return: A dict with the result of every case by its name.
+    """
+    prepared = {case_name(case): prepare_case(case) for case in cases}
+    times = {name: [] for name in prepared}
+    for i in range(repeat):
+        for name, (timer, number, _) in prepared.items():
+            times[name].append(timer.timeit(number) / number * 1e9)
+    return {name: {'median_ns': median(times[name]), 'min_ns': min(times[name]), 'number': number,
+                   'fingerprint': board_fingerprint} for name, (_, number, board_fingerprint) in prepared.items()}
+
+
+def compare(name, result, baseline, tolerance):
+    """ :return: A message when the result is a regression against the baseline, None otherwise. """
+    if baseline is None:
+        return None
+    if baseline['fingerprint'] != result['fingerprint']:
+        return "{}: the state differs from the baseline, the baseline needs to be saved again".format(name)
+    # the difference between the median and the fastest sample is the noise of a run
+    spread = max(result['median_ns'] - result['min_ns'], baseline['median_ns'] - baseline['min_ns'])
+    if result['min_ns'] > baseline['min_ns'] * (1 + tolerance) + spread:
+        return "{}: {:.1f} us, baseline {:.1f} us ({:+.0%})".format(
+            name, result['min_ns'] / 1000, baseline['min_ns'] / 1000, result['min_ns'] / baseline['min_ns'] - 1)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times AStar.process, AStar.move_safe and JumpPointSearch.process on "
+                                                 "seeded board states.")
+    parser.add_argument('--save-baseline', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--baseline', default=baseline_file, help="baseline file to compare with or save to")
+    parser.add_argument('--repeat', type=int, default=repeat, help="rounds of samples over all cases")
+    parser.add_argument('--tolerance', type=float, default=tolerance, help="allowed slow down, 0.1 means 10%%")
+    parser.add_argument('--max-size', type=int, default=max(sizes), help="skip the boards larger than this")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        baseline = {}
+
+    results = time_cases([case for case in make_cases(args.seed) if case.size <= args.max_size], args.repeat)
+    regressions = []
+    for name in results:
+        print("{:<60} {:>10.1f} us".format(name, results[name]['min_ns'] / 1000))
+        regression = compare(name, results[name], baseline.get(name), args.tolerance)
+        if regression is not None:
+            regressions.append(regression)
+
+    speedups = []
+    for case in make_cases(args.seed):
+        astar_name = case_name(case._replace(operation='process'))
+        if case.operation == 'jps' and case_name(case) in results and astar_name in results:
+            speedups.append(results[astar_name]['min_ns'] / results[case_name(case)]['min_ns'])
+            print("{:<60} {:>9.1f}x".format(case_name(case) + " vs process", speedups[-1]))
+    if len(speedups) > 0:
+        print("JumpPointSearch.process is {:.1f}x as fast as AStar.process (median over {} cases)".format(
+            median(speedups), len(speedups)))
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print("Baseline saved to " + args.baseline)
+    elif len(regressions) > 0:
+        print("\n{} REGRESSION(S) against {}:".format(len(regressions), args.baseline))
+        for regression in regressions:
+            print("  " + regression)
+        sys.exit(1)
+    elif len(baseline) == 0:
+        print("No baseline found at {}, run with --save-baseline to create one".format(args.baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,158 @@
-from random import randint
+import random
 from gameobjects import *
+from gridstate import GridState, ReadOnlyGridState, WALL
+from instrumentation import instrumentation
 
 
-class Board:
+class ReadOnlyColumn(list):
+    """
+    Column of the board grid. It can be read like any list, but changing it raises a TypeError so that agents can be
+    handed the live grid instead of a copy. The board itself writes through the list methods.
+    """
+
+    def _read_only(self, *args):
+        raise TypeError("the board can not be changed, use a copy of it instead")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+
+class BoardView(tuple):
+    """
+    Read-only view of the board handed to the agents. It is a tuple of the columns of the grid, so view[x][y] and
+    len(view) work like on a copy of the grid at the speed of a tuple, but it always shows the current state.
+
+    The same cells are available as bytes of GameObject values, cell (x, y) at index x * height + y, through state: a
+    ReadOnlyGridState of the board, with the reading methods of a GridState and buffer() to export the bytes without
+    copying them, for instance for np.frombuffer.
+    """
 
-    max_random_tries = 5
+    def __new__(cls, columns, state):
+        view = super().__new__(cls, columns)
+        view.state = ReadOnlyGridState(state)
+        return view
 
-    def __init__(self, board_width, board_height, canvas_width, canvas_height, snake, max_nr_food, nr_walls, test_config):
+
+class Board:
+
+    def __init__(self, board_width, board_height, canvas_width, canvas_height, snake, max_nr_food, nr_walls,
+                 test_config, rng=None):
+        """
+        :param rng: The RandomStream of the game, used for every random position. None to use the random module.
+        """
         self.snake = snake
+        self.rng = random if rng is None else rng
         self.width = board_width
         self.height = board_height
-        self.board = [[GameObject.EMPTY for x in range(board_width)] for y in range(board_height)]
+        # the grid is the single authoritative game state, the snake writes its head and body cells in it as it moves
+        self.board = [ReadOnlyColumn(GameObject.EMPTY for y in range(board_height)) for x in range(board_width)]
+        # the same grid as bytes, kept in sync by set_game_object_at for byte compares, bitboards and snapshots
+        self.state = GridState(board_width, board_height)
+        self.view = BoardView(self.board, self.state)
+        # index of the empty cells: an array to draw from and the position of each cell in it, kept up to date by
+        # set_game_object_at so a random empty cell can be picked in constant time
+        self.free_cells = [(x, y) for x in range(board_width) for y in range(board_height)]
+        self.free_index = {cell: i for i, cell in enumerate(self.free_cells)}
+        # canvas the board was drawn on with the rectangle of every cell, and the cells changed since that drawing
+        self.canvas = None
+        self.cell_items = None
+        self.dirty_cells = set()
         self.block_width = canvas_width / board_width
         self.block_height = canvas_height / board_height
         self.max_nr_food = max_nr_food
 
+        if test_config:
+            self.set_game_object_at(7, 5, GameObject.WALL)
+            self.set_game_object_at(15, 8, GameObject.WALL)
+            if self.board[snake.x][snake.y] != GameObject.EMPTY:
+                snake.x, snake.y = self.get_free_xy()
+        self.set_game_object_at(snake.x, snake.y, GameObject.SNAKE_HEAD)
+
         if not test_config:
             for i in range(nr_walls):
                 self.spawn_wall()
-        else:
-            self.set_game_object_at(7, 5, GameObject.WALL)
-            self.set_game_object_at(15, 8, GameObject.WALL)
 
         for i in range(max_nr_food):
             self.spawn_new_food()
 
     def get_game_object_at(self, x, y):
-        if self.board[x][y] is None:
-            return GameObject.EMPTY
-        if self.snake.contains_head(x, y):
-            return GameObject.SNAKE_HEAD
-        if self.snake.contains_body(x, y):
-            return GameObject.SNAKE_BODY
         return self.board[x][y]
 
     def is_wall_at(self, x, y):
-        return self.board[x][y] == GameObject.WALL
+        return self.state.cells[x * self.height + y] == WALL
 
     def set_game_object_at(self, x, y, game_object):
-        self.board[x][y] = game_object
+        previous = self.board[x][y]
+        list.__setitem__(self.board[x], y, game_object)
+        self.state.cells[x * self.height + y] = game_object.value
+        if previous != game_object:
+            self.dirty_cells.add((x, y))
+        if previous == GameObject.EMPTY and game_object != GameObject.EMPTY:
+            self.remove_free_cell((x, y))
+        elif previous != GameObject.EMPTY and game_object == GameObject.EMPTY:
+            self.add_free_cell((x, y))
+
+    def add_free_cell(self, cell):
+        self.free_index[cell] = len(self.free_cells)
+        self.free_cells.append(cell)
+
+    def remove_free_cell(self, cell):
+        # move the last free cell into the slot of the removed one
+        i = self.free_index.pop(cell)
+        last = self.free_cells.pop()
+        if i < len(self.free_cells):
+            self.free_cells[i] = last
+            self.free_index[last] = i
 
     def draw(self, canvas):
-        for x in range(0, self.width):
-            for y in range(0, self.height):
-                draw_x = x * self.block_width
-                draw_y = y * self.block_height
-                canvas.create_rectangle(draw_x, draw_y, draw_x + self.block_width, draw_y + self.block_height,
-                                        fill=self.get_game_object_at(x, y).getColor(), outline="")
+        """
+        Creates a rectangle for every cell the first time the board is drawn on a canvas. After that only the color of
+        the cells that changed since the previous drawing is updated, so the canvas must not be cleared in between.
+        """
+        with instrumentation.timer("Board.draw", self.width, self.height):
+            if self.cell_items is None or self.canvas is not canvas:
+                self.canvas = canvas
+                self.cell_items = []
+                for x in range(0, self.width):
+                    column = []
+                    for y in range(0, self.height):
+                        draw_x = x * self.block_width
+                        draw_y = y * self.block_height
+                        column.append(canvas.create_rectangle(draw_x, draw_y, draw_x + self.block_width,
+                                                              draw_y + self.block_height,
+                                                              fill=self.get_game_object_at(x, y).getColor(),
+                                                              outline=""))
+                    self.cell_items.append(column)
+            else:
+                for x, y in self.dirty_cells:
+                    canvas.itemconfigure(self.cell_items[x][y], fill=self.board[x][y].getColor())
+            self.dirty_cells.clear()
+
+    def clear_drawing(self):
+        """ Forgets the rectangles of the cells after the canvas was cleared, so the next draw creates them again. """
+        self.cell_items = None
 
     def eat_food(self, x, y):
-        self.board[x][y] = GameObject.EMPTY
-        self.spawn_new_food()
+        """ :return: (x, y) of the food block spawned to replace the eaten one. """
+        if self.board[x][y] == GameObject.FOOD:
+            self.set_game_object_at(x, y, GameObject.EMPTY)
+        return self.spawn_new_food()
+
+    def get_view(self):
+        """
+        Used to hand the board to an agent without copying it. The view is indexed like the grid (view[x][y]) and
+        always shows the current state, but neither the view nor its columns can be changed.
+
+        :return: The BoardView of the board.
+        """
+        return self.view
 
     def get_copy(self):
-        copy = [[GameObject.EMPTY for x in range(self.width)] for y in range(self.height)]
-        for x in range(self.width):
-            for y in range(self.height):
-                copy[x][y] = self.get_game_object_at(x, y)
-        return copy
+        with instrumentation.timer("Board.get_copy", self.width, self.height):
+            return [list(column) for column in self.board]
 
     def spawn_new_food(self):
-        self.spawn_random_object(GameObject.FOOD)
+        return self.spawn_random_object(GameObject.FOOD)
 
     def spawn_wall(self):
         self.spawn_random_object(GameObject.WALL)
@@ -68,28 +160,9 @@ class Board:
     def spawn_random_object(self, gameObjectType):
         new_x, new_y = self.get_free_xy()
         self.set_game_object_at(new_x, new_y, gameObjectType)
+        return new_x, new_y
 
     def get_free_xy(self):
-        new_x = randint(0, self.width - 1)
-        new_y = randint(0, self.height - 1)
-        count = 0
-        # try to find a random position
-        while not (self.get_game_object_at(new_x, new_y) == GameObject.EMPTY) and count < self.max_random_tries:
-            count += 1
-            new_x = randint(0, self.width - 1)
-            new_y = randint(0, self.height - 1)
-
-        # if no random position could be guessed, try a more decent approach
-        if not self.get_game_object_at(new_x, new_y) == GameObject.EMPTY:
-            available = []
-            for x in range(self.width):
-                for y in range(self.height):
-                    if self.get_game_object_at(x, y) == GameObject.EMPTY:
-                        available.append((x, y))
-
-            if len(available) == 0:
-                raise RuntimeError("Congratulations, you broke the game by filling each cell of the board!")
-            else:
-                new_x, new_y = available[randint(0, len(available) - 1)]
-
-        return new_x, new_y
+        if len(self.free_cells) == 0:
+            raise RuntimeError("Congratulations, you broke the game by filling each cell of the board!")
+        return self.free_cells[self.rng.randint(0, len(self.free_cells) - 1)]
@@ -0,0 +1,122 @@
+from collections import namedtuple
+import time
+
+from snake import Snake
+from board import Board
+from instrumentation import instrumentation
+from randomstream import RandomStream
+from replay import Recorder
+
+""" BEGIN GAME SETTINGS """
+# Number of games to play when running this file directly
+nr_games = 100
+# Board width and height
+board_width = 25
+board_height = 25
+# Maximum number of food blocks on the board
+food_blocks_max = 3
+# Maximum number of wall blocks on the board
+wall_blocks_max = 3
+# Indicates whether the test setup need to be used, turn to false to use the wall_blocks_max for spawning random walls
+test_config = False
+# Number of turns to starve, -1 for disabled
+starvation_tics = -1
+# File to write the latency histograms to after the last game (.json or .csv), None to not measure them
+latency_report = None
+# File to append a replay of every game to, None to not record them
+replay_file = None
+# Seed of the games, None for different games on every run
+seed = None
+# Number of turns after which a game is ended as if the snake died, None to play until the snake dies
+max_turns = 100000
+""" END GAME SETTINGS """
+
+GameResult = namedtuple('GameResult', ['score', 'turns', 'capped'], defaults=[False])
+
+
+def new_game(board_width=board_width, board_height=board_height, food_blocks_max=food_blocks_max,
+             wall_blocks_max=wall_blocks_max, test_config=test_config, starvation_tics=starvation_tics, recorder=None,
+             seed=None):
+    """
+    Creates a snake and a board without any canvas attached. The canvas size is only used by the board to compute the
+    size of a block when drawing, so the board size is passed to keep a block at one unit.
+
+    :param recorder: A replay.Recorder to record the games with, None to not record them. The seed is stored in the
+    record of the first game only, the later games on the board continue its random stream and are recorded with -1.
+
+    :param seed: Seed of the RandomStream that places the snake, the walls and the food, so the games played on the
+    board only depend on it. None to use the random module instead.
+
+    :return: A tuple (snake, board).
+    """
+    rng = None if seed is None else RandomStream(seed)
+    if recorder is not None and seed is not None:
+        recorder.seed = seed
+    snake = Snake(board_width, board_height, starvation_tics, recorder, rng)
+    board = Board(board_width, board_height, board_width, board_height, snake, food_blocks_max, wall_blocks_max,
+                  test_config, rng)
+    return snake, board
+
+
+def play(snake, board, nr_games, max_turns=None):
+    """
+    Owns the game loop of main.py without tkinter: updates the snake until it dies, records the result and resets the
+    snake, just like the "after" callbacks would, but back to back without waiting.
+
+    :param nr_games: The number of games to play on the given board.
+
+    :param max_turns: Number of turns after which a game is ended as if the snake died, None to play every game until
+    the snake dies. Without starvation a snake that never dies would keep the run going forever.
+
+    :return: A list with a GameResult (score, turns, capped) per played game, capped is True when the game was ended
+    by max_turns.
+    """
+    results = []
+    while len(results) < nr_games:
+        capped = max_turns is not None and snake.tics_alive >= max_turns
+        if capped or snake.update(board):
+            if capped and snake.recorder is not None and snake.recorder.recording:
+                snake.recorder.finish(snake)
+            results.append(GameResult(snake.score, snake.tics_alive, capped))
+            snake.reset(board, print_score=False)
+    return results
+
+
+def run_games(nr_games, board_width=board_width, board_height=board_height, food_blocks_max=food_blocks_max,
+              wall_blocks_max=wall_blocks_max, test_config=test_config, starvation_tics=starvation_tics, recorder=None,
+              seed=None, max_turns=max_turns):
+    """
+    Plays nr_games games back to back on a single board, the same way the tkinter version does. With a seed the games
+    are the same on every run.
+
+    :param max_turns: Number of turns after which a game is ended as if the snake died, None to play every game until
+    the snake dies.
+
+    :return: A list with a GameResult (score, turns, capped) per played game.
+    """
+    snake, board = new_game(board_width, board_height, food_blocks_max, wall_blocks_max, test_config, starvation_tics,
+                            recorder=recorder, seed=seed)
+    return play(snake, board, nr_games, max_turns)
+
+
+def main():
+    if latency_report is not None:
+        instrumentation.enable()
+    start = time.perf_counter()
+    if replay_file is None:
+        results = run_games(nr_games, seed=seed)
+    else:
+        with open(replay_file, 'ab') as file:
+            results = run_games(nr_games, recorder=Recorder(file), seed=seed)
+    duration = time.perf_counter() - start
+    turns = sum(result.turns for result in results)
+    print("Games played: {}. Mean score: {:.2f}. Mean turns: {:.2f}. Max score: {}".format(
+        len(results), sum(result.score for result in results) / len(results), turns / len(results),
+        max(result.score for result in results)))
+    print("Took {:.2f} seconds ({:.0f} turns per second)".format(duration, turns / duration))
+    if latency_report is not None:
+        instrumentation.export(latency_report)
+
+
+if __name__ == "__main__":
+    main()
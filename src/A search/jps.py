@@ -0,0 +1,203 @@
+"""
+Jump Point Search for the 4-connected boards of the game, a drop-in replacement of AStar selected with the
+pathfinding_engine setting of agent.py. Instead of every cell it passes, it only puts the cells where a path may have
+to turn on the open list, so on boards with few walls it expands a lot fewer cells than AStar for the same path.
+
+Of all shortest paths only the canonical ones are searched: the paths that go horizontally first and only turn
+vertically where they have to, to reach a food block or to get around an obstacle. The cells of a column are
+consecutive in the arrays of AStar, so a column is read into an int with a byte per cell in one call, and the cells at
+which vertical scans stop are found with a few shifts on those ints instead of cell by cell.
+"""
+import heapq
+
+from agent import AStar
+
+
+class JumpPointSearch(AStar):
+    """
+    AStar with the search replaced by a jump point search. The open list holds jump points, the parent of a jump point
+    is the previous jump point on its path, in a straight line from it. The path is filled in between them when it is
+    stored, so following it and checking it every turn works like for AStar.
+
+    The columns are read on demand and kept for the rest of the search, like the other arrays they are only valid when
+    their stamp equals the current generation. The ints of a column have byte y set to 1 for cell (x, y).
+    """
+
+    def __init__(self, grid_width, grid_height):
+        super().__init__(grid_width, grid_height)
+        # a 1 in the byte of every cell of a column
+        self.full_column = int.from_bytes(b'\x01' * grid_height, 'little')
+        self.open_stamp = [0] * grid_width
+        self.open_columns = [0] * grid_width
+        # the food blocks of the columns that have one, built from the ends at the start of a search
+        self.goal_columns = {}
+        # the cells a scan to the south and to the north stops at
+        self.column_stamp = [0] * grid_width
+        self.south_stops = [0] * grid_width
+        self.north_stops = [0] * grid_width
+
+    def get_open_column(self, x):
+        if x < 0 or x >= self.grid_width:
+            return 0
+        if self.open_stamp[x] != self.generation:
+            height = self.grid_height
+            self.open_stamp[x] = self.generation
+            self.open_columns[x] = int.from_bytes(bytes(self.reachable[x * height:(x + 1) * height]), 'little')
+        return self.open_columns[x]
+
+    def update_column(self, x):
+        """
+        Computes the stops of column x. A vertical scan stops at blocked cells, at food blocks and at open cells with a
+        forced neighbor: an open cell to the side while the cell diagonally behind it is blocked. A shortest path may
+        have to turn into such a neighbor, which is not possible from the cells before it.
+        """
+        full = self.full_column
+        open_cells = self.get_open_column(x)
+        west = self.get_open_column(x - 1)
+        east = self.get_open_column(x + 1)
+        stops = (full & ~open_cells) | self.goal_columns.get(x, 0)
+        # shifting a column by 8 moves every cell one row, outside the board counts as blocked
+        self.south_stops[x] = stops | (open_cells & ((west & ~(west << 8)) | (east & ~(east << 8))))
+        self.north_stops[x] = stops | (open_cells & ((west & ~(west >> 8)) | (east & ~(east >> 8))))
+        self.column_stamp[x] = self.generation
+
+    def jump_vertical(self, cell, step):
+        """
+        Scans the column of cell from cell on, to the south for step 1 and to the north for step -1.
+
+        :return: The jump point the scan stops at, -1 when it runs into a blocked cell or off the board.
+        """
+        x, y = divmod(cell, self.grid_height)
+        if self.column_stamp[x] != self.generation:
+            self.update_column(x)
+        if step > 0:
+            stops = self.south_stops[x] >> (8 * y)
+            if stops == 0:
+                return -1
+            stop = cell + (((stops & -stops).bit_length() - 1) >> 3)
+        else:
+            stops = self.north_stops[x] & ((1 << (8 * y + 8)) - 1)
+            if stops == 0:
+                return -1
+            stop = cell - y + ((stops.bit_length() - 1) >> 3)
+        return stop if self.reachable[stop] else -1
+
+    def jump_horizontal(self, cell, step):
+        """
+        Scans the row of cell from cell on, to the east for step grid_height and to the west for step -grid_height.
+        Besides food blocks and forced neighbors, it stops at the cells from which a vertical scan finds a jump point.
+
+        :return: The jump point the scan stops at, -1 when it runs into a blocked cell or off the board.
+        """
+        height = self.grid_height
+        reachable = self.reachable
+        generation = self.generation
+        x, y = divmod(cell, height)
+        direction = 1 if step > 0 else -1
+        # the stops above the row, and the shift that drops the stops up to the row below it
+        above = (1 << (8 * y)) - 1
+        below = 8 * y + 8
+        while 0 <= x < self.grid_width and reachable[cell]:
+            if self.goal[cell]:
+                return cell
+            if self.column_stamp[x] != generation:
+                self.update_column(x)
+            # the cell behind is on the board, the scan came from there. A forced neighbor above or below, or a
+            # vertical scan from there that stops at an open cell, makes this cell a jump point
+            if y > 0 and reachable[cell - 1]:
+                if not reachable[cell - step - 1]:
+                    return cell
+                stops = self.north_stops[x] & above
+                if stops and reachable[cell - y + ((stops.bit_length() - 1) >> 3)]:
+                    return cell
+            if y < height - 1 and reachable[cell + 1]:
+                if not reachable[cell - step + 1]:
+                    return cell
+                stops = self.south_stops[x] >> below
+                if stops and reachable[cell + 1 + (((stops & -stops).bit_length() - 1) >> 3)]:
+                    return cell
+            x += direction
+            cell += step
+        return -1
+
+    def get_jump_points(self, cell):
+        """
+        :return: The jump points found from cell in every direction but the one back to its parent, with their
+        distance from cell.
+        """
+        height = self.grid_height
+        x, y = self.get_xy(cell)
+        parent = self.parent[cell]
+        back = None
+        if parent != -1:
+            parent_x, parent_y = self.get_xy(parent)
+            if parent_x == x:
+                back = -1 if parent_y < y else 1
+            else:
+                back = -height if parent_x < x else height
+        result = []
+        for step, inside in ((-1, y > 0), (1, y < height - 1), (height, x < self.grid_width - 1), (-height, x > 0)):
+            if step == back or not inside or not self.reachable[cell + step]:
+                continue
+            if step == 1 or step == -1:
+                jump_point = self.jump_vertical(cell + step, step)
+                if jump_point != -1:
+                    result.append((jump_point, abs(jump_point - cell)))
+            else:
+                jump_point = self.jump_horizontal(cell + step, step)
+                if jump_point != -1:
+                    result.append((jump_point, abs(jump_point - cell) // height))
+        return result
+
+    def search(self):
+        """
+        Runs the jump point search from the head towards all food blocks at once, in a new generation of the arena,
+        the same way AStar.search does with the neighbors of a cell replaced by its jump points.
+
+        :return: True if a food block was reached, it is stored in self.end and the jump points of the path can be
+        followed back through self.parent.
+        """
+        self.generation += 1
+        generation = self.generation
+        self.goal_columns = {}
+        for end in self.ends:
+            x, y = self.get_xy(end)
+            self.goal_columns[x] = self.goal_columns.get(x, 0) | 1 << (8 * y)
+        self.stamp[self.start] = generation
+        self.g[self.start] = 0
+        self.f[self.start] = self.get_heuristic(self.start)
+        self.parent[self.start] = -1
+        self.opened = [(self.f[self.start], self.start)]
+        while len(self.opened) > 0:
+            f, cell = heapq.heappop(self.opened)
+            if self.closed[cell] == generation:
+                continue
+            self.closed[cell] = generation
+            if self.goal[cell]:
+                self.end = cell
+                return True
+            for jump_point, distance in self.get_jump_points(cell):
+                if self.closed[jump_point] != generation:
+                    g = self.g[cell] + 10 * distance
+                    if self.stamp[jump_point] != generation or self.g[jump_point] > g:
+                        self.stamp[jump_point] = generation
+                        self.g[jump_point] = g
+                        self.f[jump_point] = g + self.get_heuristic(jump_point)
+                        self.parent[jump_point] = cell
+                        heapq.heappush(self.opened, (self.f[jump_point], jump_point))
+        return False
+
+    def store_path(self):
+        """ Stores the path found by the last search, with the cells between its jump points filled in. """
+        self.path = []
+        cell = self.end
+        while cell != self.start:
+            parent = self.parent[cell]
+            if cell // self.grid_height == parent // self.grid_height:
+                step = 1 if cell > parent else -1
+            else:
+                step = self.grid_height if cell > parent else -self.grid_height
+            while cell != parent:
+                self.path.append(cell)
+                cell -= step
+        self.path_ends = set(self.ends)
@@ -1,6 +1,10 @@
 from tkinter import *
+import time
+
 from snake import Snake
 from board import Board
+from instrumentation import instrumentation
+from randomstream import RandomStream
 
 root = None
 canvas = None
@@ -9,6 +13,11 @@ canvas_width = 800
 canvas_height = 800
 
 tics_per_second = 4
+# maximum number of times per second the board is drawn, independent of the number of turns per second
+frames_per_second = 60
+# time of the previous frame and the number of turns that are due but not simulated yet
+last_frame_time = 0
+tick_backlog = 0
 
 """ BEGIN GAME SETTINGS """
 # Board width and height
@@ -22,6 +31,10 @@ wall_blocks_max = 3
 test_config = False
 # Number of turns to starve, -1 for disabled
 starvation_tics = -1
+# File to write the latency histograms to when the game is closed (.json or .csv), None to not measure them
+latency_report = None
+# Seed of the game, None for a different game on every run
+seed = None
 """ END GAME SETTINGS """
 
 # game objects
@@ -34,7 +47,7 @@ def callback():
 
 
 def main():
-    global root, canvas, canvas_height, canvas_width, board, snake, scale
+    global root, canvas, canvas_height, canvas_width, board, snake, scale, last_frame_time
     root = Tk()
     root.title("Snake")
     canvas = Canvas(root, width=canvas_width, height=canvas_height)
@@ -46,32 +59,60 @@ def main():
     scale.pack(side=LEFT)
     b = Button(root, text="Next Step", command=callback)
     b.pack()
-    snake = Snake(board_width, board_height, starvation_tics)
+    if latency_report is not None:
+        instrumentation.enable()
+    rng = None if seed is None else RandomStream(seed)
+    snake = Snake(board_width, board_height, starvation_tics, rng=rng)
     board = Board(board_width, board_height, canvas_width, canvas_height, snake, food_blocks_max, wall_blocks_max,
-                  test_config)
+                  test_config, rng)
     board.draw(canvas)
-    canvas.after(int(1000 / tics_per_second), game_loop)
+    last_frame_time = time.perf_counter()
+    canvas.after(int(1000 / frames_per_second), game_loop)
     mainloop()
+    if latency_report is not None:
+        instrumentation.export(latency_report)
 
 
 def game_loop():
-    global canvas, tics_per_second
+    """
+    Runs once per frame. The ticks the slider asks for since the previous frame are simulated first, for at most one
+    frame of time, after which the board is drawn once. Ticks that do not fit are dropped, so a slow agent slows the
+    game down instead of freezing the window.
+    """
+    global canvas, tics_per_second, last_frame_time, tick_backlog
+    now = time.perf_counter()
     if tics_per_second > 0:
-        update()
-        canvas.after(int(1000 / tics_per_second), game_loop)
+        tick_backlog += (now - last_frame_time) * tics_per_second
+        if tick_backlog >= 1:
+            deadline = now + 1 / frames_per_second
+            while tick_backlog >= 1:
+                tick_backlog -= 1
+                step()
+                if time.perf_counter() > deadline:
+                    tick_backlog = 0
+            draw()
     else:
-        canvas.after(int(1000), game_loop)
+        tick_backlog = 0
+    last_frame_time = now
+    frame_time = time.perf_counter() - now
+    canvas.after(max(1, int(1000 * (1 / frames_per_second - frame_time))), game_loop)
 
 
 def update():
-    global tics_per_second, board, snake, canvas
-    # update gamestate
+    step()
+    draw()
+
+
+def step():
+    """ Simulates a single turn. """
+    global board, snake
     if snake.update(board):
         snake.reset(board)
-    # clear canvas
-    canvas.delete("all")
 
-    # draw new state
+
+def draw():
+    """ Draws the cells that changed. """
+    global board, canvas
     board.draw(canvas)
 
 
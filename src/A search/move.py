@@ -22,7 +22,7 @@ class Direction(Enum):
 
         :return: The new direction after making this move.
         """
-        return Direction((self.value + move.value) % 4)
+        return new_directions[self._value_][move._value_]
 
     def get_xy_manipulation(self):
         """
@@ -37,13 +37,7 @@ class Direction(Enum):
         :return: A tuple with the x and y manipulation when going straight given the direction. The x value is the
         first element and the y value the second element.
         """
-        m = {
-            Direction.NORTH: (0, -1),
-            Direction.EAST: (1, 0),
-            Direction.SOUTH: (0, 1),
-            Direction.WEST: (-1, 0)
-        }
-        return m[self]
+        return xy_manipulations[self._value_]
 
     def get_xy_moves(self):
         """
@@ -52,14 +46,25 @@ class Direction(Enum):
 
         :return: A list containing all available x y manipulations given the direction.
         """
-        m = {
-            Direction.NORTH: [Direction.NORTH.get_xy_manipulation(), Direction.EAST.get_xy_manipulation(),
-                              Direction.WEST.get_xy_manipulation()],
-            Direction.EAST: [Direction.NORTH.get_xy_manipulation(), Direction.EAST.get_xy_manipulation(),
-                             Direction.SOUTH.get_xy_manipulation()],
-            Direction.SOUTH: [Direction.SOUTH.get_xy_manipulation(), Direction.EAST.get_xy_manipulation(),
-                              Direction.WEST.get_xy_manipulation()],
-            Direction.WEST: [Direction.NORTH.get_xy_manipulation(), Direction.WEST.get_xy_manipulation(),
-                             Direction.SOUTH.get_xy_manipulation()],
-        }
-        return m[self]
+        return list(xy_moves[self._value_])
+
+
+"""
+Lookup tables of the methods above, for the code that runs every turn. They are indexed by _value_, the value of an
+enum member as a plain attribute: reading member.value goes through a descriptor and takes about ten times as long.
+"""
+# Direction of every value
+directions = (Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST)
+# x and y manipulation of every direction: xy_manipulations[direction._value_]
+xy_manipulations = ((0, -1), (1, 0), (0, 1), (-1, 0))
+# x and y manipulations of the moves available in every direction, in the order of get_xy_moves
+xy_moves = (((0, -1), (1, 0), (-1, 0)), ((0, -1), (1, 0), (0, 1)), ((0, 1), (1, 0), (-1, 0)),
+            ((0, -1), (-1, 0), (0, 1)))
+# direction after a move: new_directions[direction._value_][move._value_]. The entries are ordered straight, right,
+# left, so the -1 of Move.LEFT indexes the last one
+new_directions = tuple((directions[value], directions[(value + 1) % 4], directions[(value - 1) % 4])
+                       for value in range(4))
+# move that turns from a direction to a target direction: turn_moves[direction._value_][target._value_]. The snake
+# can not turn around, the opposite direction gives Move.LEFT
+turn_moves = tuple(tuple((Move.STRAIGHT, Move.RIGHT, Move.LEFT, Move.LEFT)[(target - value) % 4] for target in range(4))
+                   for value in range(4))
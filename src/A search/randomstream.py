@@ -0,0 +1,33 @@
+import random
+
+
+class RandomStream:
+    """
+    Random numbers of a single game. The numbers come from a random.Random seeded with the seed of the game and are
+    generated in blocks, so a game only depends on its seed and not on what else uses the random module, and drawing
+    a spawn position is a list look up.
+
+    Board and Snake take one as rng. Without it they use the random module, like the game always did.
+    """
+
+    # number of random numbers generated at once
+    block_size = 1024
+
+    def __init__(self, seed=None):
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.block = []
+        self.index = 0
+
+    def fill(self):
+        next_random = self.random.random
+        self.block = [next_random() for i in range(self.block_size)]
+        self.index = 0
+
+    def randint(self, a, b):
+        """ :return: A random integer N with a <= N <= b, like random.randint. """
+        if self.index == len(self.block):
+            self.fill()
+        value = self.block[self.index]
+        self.index += 1
+        return a + int(value * (b - a + 1))
@@ -0,0 +1,228 @@
+"""
+Recording and playback of games in a compact binary format. A Recorder handed to the Snake appends one record per game
+to a binary file: a fixed size header followed by the walls and food at the start of the game, the food spawned while
+playing and one byte per move. Any turn of a recorded game can be rebuilt from this by replaying the moves, without
+running the agent.
+
+The records are read through mmap, so a file with millions of games can be scanned without loading it:
+"for replay in scan('games.replay', died_near_food): ..."
+
+Record layout, all little endian:
+    header: magic b"SNRP", seed (int64, -1 when unknown), width, height, start x, start y (uint16), start direction
+            (uint8), 3 padding bytes, number of walls, food blocks, food spawns and moves, score and turns (uint32)
+    walls, food and spawns: (x, y) pairs of uint16
+    moves: a byte per move, the Move value + 1
+"""
+from collections import deque, namedtuple
+import mmap
+import struct
+
+from gameobjects import GameObject
+from move import Direction, Move, new_directions, xy_manipulations
+
+header = struct.Struct("<4sqHHHHBxxxIIIIII")
+position = struct.Struct("<HH")
+magic = b"SNRP"
+
+# state of a recorded game after tick moves. body is in head to tail order and alive is False after a deadly move
+ReplayState = namedtuple('ReplayState', ['tick', 'head', 'direction', 'body', 'food', 'score', 'alive'])
+
+
+def pack_positions(positions):
+    return b"".join(position.pack(x, y) for x, y in positions)
+
+
+class Recorder:
+    """
+    Collects the moves of the game being played and appends the record of the game to the file once the snake dies.
+    Set seed before a game to store the seed it was played with. Only that game can be rebuilt from the seed, the next
+    games on the same board continue its random stream, so the seed goes back to -1 once the record is written.
+    """
+
+    def __init__(self, file):
+        """
+        :param file: Binary file opened for appending, or any other object with a write method like io.BytesIO.
+        """
+        self.file = file
+        self.seed = -1
+        self.recording = False
+        self.start = None
+        self.walls = None
+        self.food = None
+        self.spawns = []
+        self.moves = bytearray()
+
+    def begin(self, board, snake):
+        """ Stores the state of the board at the start of a game. """
+        self.recording = True
+        self.start = (snake.x, snake.y, snake.direction.value, board.width, board.height)
+        self.walls = []
+        self.food = []
+        for x, column in enumerate(board.board):
+            for y, game_object in enumerate(column):
+                if game_object == GameObject.WALL:
+                    self.walls.append((x, y))
+                elif game_object == GameObject.FOOD:
+                    self.food.append((x, y))
+        self.spawns = []
+        self.moves = bytearray()
+
+    def record_move(self, move):
+        self.moves.append(move.value + 1)
+
+    def record_food(self, position):
+        self.spawns.append(position)
+
+    def finish(self, snake):
+        """ Writes the record of the game that just ended. """
+        x, y, direction, width, height = self.start
+        self.file.write(header.pack(magic, self.seed, width, height, x, y, direction, len(self.walls), len(self.food),
+                                    len(self.spawns), len(self.moves), snake.score, snake.tics_alive))
+        self.file.write(pack_positions(self.walls))
+        self.file.write(pack_positions(self.food))
+        self.file.write(pack_positions(self.spawns))
+        self.file.write(self.moves)
+        self.recording = False
+        self.seed = -1
+
+
+class Replay:
+    """ A single recorded game, reading its walls, food and moves straight from the buffer it was found in. """
+
+    def __init__(self, buffer, offset):
+        (record_magic, self.seed, self.width, self.height, start_x, start_y, direction, nr_walls, nr_food, nr_spawns,
+         nr_moves, self.score, self.turns) = header.unpack_from(buffer, offset)
+        if record_magic != magic:
+            raise ValueError("no replay record at offset {}".format(offset))
+        self.start = (start_x, start_y)
+        self.direction = Direction(direction)
+        self.buffer = buffer
+        self.offset = offset
+        offset += header.size
+        self.walls_offset = offset
+        self.food_offset = self.walls_offset + nr_walls * position.size
+        self.spawns_offset = self.food_offset + nr_food * position.size
+        self.moves_offset = self.spawns_offset + nr_spawns * position.size
+        self.end = self.moves_offset + nr_moves
+        self.nr_moves = nr_moves
+
+    def copy(self):
+        """ :return: The same replay on a copy of its record, which can still be read after the file is closed. """
+        return Replay(self.buffer[self.offset:self.end], 0)
+
+    def positions(self, start, stop):
+        return [xy for xy in position.iter_unpack(self.buffer[start:stop])]
+
+    def walls(self):
+        return self.positions(self.walls_offset, self.food_offset)
+
+    def initial_food(self):
+        return self.positions(self.food_offset, self.spawns_offset)
+
+    def spawns(self):
+        return self.positions(self.spawns_offset, self.moves_offset)
+
+    def moves(self):
+        return [Move(value - 1) for value in self.buffer[self.moves_offset:self.end]]
+
+    def states(self):
+        """
+        Plays the recorded moves with the rules of the game: the snake holds the last score + 1 positions of its head,
+        the turn after eating its tail stays where it is and a spawned food block appears right after eating.
+
+        :return: A generator of the ReplayState before the first move and after every move.
+        """
+        walls = set(self.walls())
+        food = set(self.initial_food())
+        spawns = iter(self.spawns())
+        direction = self.direction
+        # positions of the head, the current one first, that are occupied by the snake. When there are more than
+        # score of them, the last one is the tail and it moves away before the head moves
+        heads = deque([self.start])
+        visited = {self.start}
+        score = 0
+        yield ReplayState(0, self.start, direction, (), frozenset(food), score, True)
+        for tick, value in enumerate(self.buffer[self.moves_offset:self.end], 1):
+            # the byte is the value of the move plus one
+            direction = new_directions[direction._value_][value - 1]
+            man_x, man_y = xy_manipulations[direction._value_]
+            x, y = heads[0][0] + man_x, heads[0][1] + man_y
+            if len(heads) > score:
+                visited.discard(heads.pop())
+            alive = 0 <= x < self.width and 0 <= y < self.height and (x, y) not in walls and (x, y) not in visited
+            heads.appendleft((x, y))
+            visited.add((x, y))
+            if alive and (x, y) in food:
+                food.discard((x, y))
+                score += 1
+                spawn = next(spawns, None)
+                if spawn is not None:
+                    food.add(spawn)
+            yield ReplayState(tick, (x, y), direction, tuple(heads)[1:], frozenset(food), score, alive)
+            if not alive:
+                return
+
+    def state_at(self, tick):
+        """ Fast forwards to the given tick, the last state when the game is shorter. """
+        state = None
+        for state in self.states():
+            if state.tick == tick:
+                break
+        return state
+
+    def board_at(self, tick):
+        """
+        :return: The board after the given number of moves as a list of columns of GameObjects, like Board.get_copy.
+        """
+        state = self.state_at(tick)
+        board = [[GameObject.EMPTY] * self.height for x in range(self.width)]
+        for x, y in self.walls():
+            board[x][y] = GameObject.WALL
+        for x, y in state.food:
+            board[x][y] = GameObject.FOOD
+        for x, y in state.body:
+            board[x][y] = GameObject.SNAKE_BODY
+        head_x, head_y = state.head
+        if state.alive:
+            board[head_x][head_y] = GameObject.SNAKE_HEAD
+        return board
+
+
+def read_replays(path):
+    """
+    Memory maps the file and yields its records one by one. Only the headers are read while scanning, the rest of a
+    record is read when it is used, which has to happen before the generator ends and the file is closed. Use
+    Replay.copy to keep a record longer.
+
+    :return: A generator of Replay objects.
+    """
+    with open(path, 'rb') as file:
+        if file.seek(0, 2) == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            offset = 0
+            while offset < len(buffer):
+                replay = Replay(buffer, offset)
+                yield replay
+                offset = replay.end
+
+
+def died_near_food(replay, distance=3):
+    """ :return: True when the snake ran into something while food was at most distance steps from its head. """
+    previous = last = None
+    for state in replay.states():
+        previous, last = last, state
+    if last.alive or previous is None:
+        return False
+    head_x, head_y = previous.head
+    return any(abs(x - head_x) + abs(y - head_y) <= distance for x, y in previous.food)
+
+
+def scan(path, predicate):
+    """
+    :return: A generator of the replays in the file for which predicate(replay) is True. They are copied out of the
+    file, so they stay valid after the scan, like in list(scan(path, predicate)).
+    """
+    for replay in read_replays(path):
+        if predicate(replay):
+            yield replay.copy()
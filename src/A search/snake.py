@@ -1,55 +1,84 @@
-from random import randint
+from collections import deque
+import random
 
 from agent import Agent
 from gameobjects import GameObject
-from move import Direction, Move
+from instrumentation import instrumentation
+from move import Direction, Move, new_directions, xy_manipulations
 
 
 class Snake:
 
-    def __init__(self, board_width, board_height, max_tics_to_starve):
+    def __init__(self, board_width, board_height, max_tics_to_starve, recorder=None, rng=None):
+        """
+        :param recorder: A replay.Recorder that records every game played, None to not record.
+
+        :param rng: The RandomStream of the game, used for the start position. None to use the random module.
+        """
         self.board_width = board_width
         self.board_height = board_height
-        self.x = randint(0, board_width - 1)
-        self.y = randint(0, board_height - 1)
+        rng = random if rng is None else rng
+        self.x = rng.randint(0, board_width - 1)
+        self.y = rng.randint(0, board_height - 1)
         self.direction = Direction.NORTH
-        self.body_parts = []
+        # head to tail order, with a set of the same positions for constant time look ups
+        self.body_parts = deque()
+        self.body_set = set()
         self.score = 0
         self.tics_alive = 0
         self.tics_to_starve = max_tics_to_starve
         self.max_tics_to_starve = max_tics_to_starve
         self.agent = Agent(board_width, board_height)
+        self.recorder = recorder
 
     def update(self, board):
+        with instrumentation.timer("Snake.update", board.width, board.height):
+            if self.recorder is not None and not self.recorder.recording:
+                self.recorder.begin(board, self)
+            died = self.take_turn(board)
+            if died and self.recorder is not None:
+                self.recorder.finish(self)
+            return died
+
+    def take_turn(self, board):
         if len(self.body_parts) > 0 and self.body_parts[0] != (self.x, self.y):
-            self.body_parts = [(self.x, self.y)] + self.body_parts
-            del self.body_parts[-1]
+            self.push_body((self.x, self.y))
+            self.pop_tail(board)
 
         # check starvation (if enabled)
         if self.tics_to_starve != -1 and self.tics_to_starve == 0:
             return True
 
         # retrieve move from the agent
-        move = self.agent.get_move(board.get_copy(), self.score, self.tics_alive, self.tics_to_starve, self.direction)
+        with instrumentation.timer("Agent.get_move", board.width, board.height):
+            move = self.agent.get_move(board.get_view(), self.score, self.tics_alive, self.tics_to_starve,
+                                       self.direction)
 
         # check return value of get_move
         if not (move == Move.RIGHT or move == Move.LEFT or move == Move.STRAIGHT):
             return True
+        if self.recorder is not None:
+            self.recorder.record_move(move)
 
-        self.direction = self.direction.get_new_direction(move)
-        manipulation = self.direction.get_xy_manipulation()
-        self.x += manipulation[0]
-        self.y += manipulation[1]
+        self.direction = new_directions[self.direction._value_][move._value_]
+        man_x, man_y = xy_manipulations[self.direction._value_]
+        self.leave_head(board)
+        self.x += man_x
+        self.y += man_y
 
         # check if died
         if self.died(board):
             return True
 
         # check on collision with food
-        if board.board[self.x][self.y] == GameObject.FOOD:
-            self.body_parts = [(self.x, self.y)] + self.body_parts
+        ate = board.board[self.x][self.y] == GameObject.FOOD
+        board.set_game_object_at(self.x, self.y, GameObject.SNAKE_HEAD)
+        if ate:
+            self.push_body((self.x, self.y))
             self.score += 1
-            board.eat_food(self.x, self.y)
+            food = board.eat_food(self.x, self.y)
+            if self.recorder is not None:
+                self.recorder.record_food(food)
             if self.max_tics_to_starve != -1:
                 self.tics_to_starve = self.max_tics_to_starve + 1
 
@@ -59,18 +88,48 @@ class Snake:
 
         return False
 
-    def reset(self, board):
-        print("Score achieved: {}. Turns it took: {}".format(self.score, self.tics_alive))
+    def reset(self, board, print_score=True):
+        if print_score:
+            print("Score achieved: {}. Turns it took: {}".format(self.score, self.tics_alive))
         self.agent.on_die()
         self.tics_alive = 0
         self.score = 0
         self.direction = Direction.NORTH
         self.tics_to_starve = self.max_tics_to_starve
-        self.x, self.y = board.get_free_xy()
-        self.body_parts = []
+        new_x, new_y = board.get_free_xy()
+        self.remove_from(board)
+        self.x, self.y = new_x, new_y
+        self.body_parts = deque()
+        self.body_set = set()
+        board.set_game_object_at(self.x, self.y, GameObject.SNAKE_HEAD)
+
+    def push_body(self, position):
+        self.body_parts.appendleft(position)
+        self.body_set.add(position)
+
+    def pop_tail(self, board):
+        tail_x, tail_y = self.body_parts.pop()
+        self.body_set.discard((tail_x, tail_y))
+        board.set_game_object_at(tail_x, tail_y, GameObject.EMPTY)
+
+    def leave_head(self, board):
+        """ Marks the cell of the head as body when the body follows the head into it, or as empty otherwise. """
+        if len(self.body_parts) > 0 and self.body_parts[0] == (self.x, self.y):
+            board.set_game_object_at(self.x, self.y, GameObject.SNAKE_BODY)
+        else:
+            board.set_game_object_at(self.x, self.y, GameObject.EMPTY)
+
+    def remove_from(self, board):
+        """ Clears all cells of the board occupied by the snake. A head that died outside the board or in a wall
+        was never written to the board, so it is left alone. """
+        for x, y in self.body_parts:
+            board.set_game_object_at(x, y, GameObject.EMPTY)
+        if 0 <= self.x < board.width and 0 <= self.y < board.height \
+                and board.board[self.x][self.y] == GameObject.SNAKE_HEAD:
+            board.set_game_object_at(self.x, self.y, GameObject.EMPTY)
 
     def contains_body(self, x, y):
-        return (x, y) in self.body_parts
+        return (x, y) in self.body_set
 
     def contains_head(self, x, y):
         return self.x == x and self.y == y
@@ -80,8 +139,4 @@ class Snake:
             return True
         if self.y < 0 or self.y >= board.height:
             return True
-        if board.is_wall_at(self.x, self.y):
-            return True
-        if (self.x, self.y) in self.body_parts:
-            return True
-        return False
+        return board.state.is_blocked(self.x, self.y)
@@ -1,12 +1,20 @@
 from gameobjects import GameObject
-from move import Move, Direction
+from move import Move, Direction, new_directions, xy_manipulations
 from board import Board
+import numpy as np
+import time
+from valueiteration import ValueIteration
 
 
 class Agent:
 
+    # seconds of value iteration allowed per move, the values of the last sweep are used when it runs out
+    move_time_budget = 0.02
+
     def __init__(self):
         """" Constructor of the Agent, can be used to set up variables """
+        # value iteration of the previous move, the next move starts from its values
+        self.engine = None
 
     def get_move(self, board, score, turns_alive, turns_to_starve, direction, head_position, body_parts):
         """This function behaves as the 'brain' of the snake. You only need to change the code in this function for
@@ -21,7 +29,8 @@ class Agent:
         there is a wall at the given coordinate. TIP: do not run into them), GameObject.SNAKE_HEAD (meaning the head
         of the snake is located there) and GameObject.SNAKE_BODY (meaning there is a body part of the snake there.
         TIP: also, do not run into these). The snake will also die when it tries to escape the board (moving out of
-        the boundaries of the array)
+        the boundaries of the array). The board is a read-only BoardView of the live grid, board.state.buffer() gives
+        the same cells as bytes of GameObject values, cell (x, y) at index x * height + y.
 
         :param score: The current score as an integer. Whenever the snake eats, the score will be increased by one.
         When the snake tragically dies (i.e. by running its head into a wall) the score will be reset. In ohter
@@ -42,6 +51,8 @@ class Agent:
 
         :param body_parts: the array of the locations of the body parts of the snake. The last element of this array
         represents the tail and the first element represents the body part directly following the head of the snake.
+        This is the deque the snake itself uses, so do not change it and copy it (list(body_parts)) when it needs to
+        be kept after this turn.
 
         :return: The move of the snake. This can be either Move.LEFT (meaning going left), Move.STRAIGHT (meaning
         going straight ahead) and Move.RIGHT (meaning going right). The moves are made from the viewpoint of the
@@ -52,7 +63,8 @@ class Agent:
         Function: give the food a reward of 1 and let the move cost -.04.
         """
        # print(head_position[0])
-        rl = RL(board, direction, head_position)
+        rl = RL(board, direction, head_position, self.move_time_budget, self.engine)
+        self.engine = rl.engine
         return rl.rightway()
 
     def should_redraw_board(self):
@@ -106,116 +118,60 @@ class Cell(object):
         return self.f < other.f
 
 class RL(object):
-    def __init__(self, board, direction, head_position):
+    def __init__(self, board, direction, head_position, time_budget=None, engine=None):
+        """
+        :param time_budget: Seconds the value iteration may take, None to sweep until the values converge.
+
+        :param engine: ValueIteration of a previous move to start from. It is reused when the walls are the same, so
+        only the cells affected by changed food blocks are swept again.
+        """
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
         self.board = board
+        self.width = len(board)
+        self.height = len(board[0])
         self.direction = direction
         self.head_position = head_position
-        self.cells = []
-        self.init_rewards()
-        for i in range(10):
-            self.rewards()
-
-    def init_rewards(self):
-        for x in range(5):
-            for y in range(5):
-                if self.board[x][y] == GameObject.WALL:
-                    self.cells.append(Cell(x, y, False, None))
-                elif self.board[x][y] == GameObject.FOOD:
-                    self.cells.append(Cell(x, y, True, 1))
-                else:
-                    self.cells.append(Cell(x, y, True, 0))
+        self.init_rewards(engine)
+        self.engine.solve(deadline)
+
+    def init_rewards(self, engine=None):
+        state = getattr(self.board, 'state', None)
+        if state is not None:
+            # the bytes of a BoardView are the same values in the same order, so no conversion is needed
+            game_objects = np.frombuffer(state.buffer(), dtype=np.uint8).reshape(self.width, self.height)
+        else:
+            game_objects = np.array([[game_object.value for game_object in column] for column in self.board])
+        walls = game_objects == GameObject.WALL.value
+        food = game_objects == GameObject.FOOD.value
+        if engine is not None and np.array_equal(engine.walls, walls):
+            engine.set_food(food)
+            self.engine = engine
+        else:
+            self.engine = ValueIteration(walls, food)
 
     def rewards(self):
-        self.newcells = []
-        otherreward = []
-        samereward = 0
-        same = 0
-        highestreward = 0
-        reward = 0
-
-        for x in range(5):
-            for y in range(5):
-                if self.board[x][y] == GameObject.WALL:
-                    self.newcells.append(Cell(x, y, False, None))
-                elif self.board[x][y] == GameObject.FOOD:
-                    self.newcells.append(Cell(x, y, True, 1))
-                else:
-                    adjacent = self.get_adjacent_cells(Cell(x, y, None, None))
-                    length = len(adjacent)
-
-                    for i in range(0, length):
-                        if adjacent[i].reward == highestreward:
-                            same = same + 1
-                            samereward = samereward + (1 / length) * adjacent[i].reward
-                            otherreward.append(adjacent[i].reward)
-                        elif adjacent[i].reward > highestreward:
-                            otherreward.append(highestreward)
-                            highestreward = adjacent[i].reward
-                        else:
-                            otherreward.append(adjacent[i].reward)
-
-                    if same == (length - 1):
-                        reward = -0.04 + samereward
-                    else:
-                        for j in range(len(otherreward)):
-                            reward = reward + (0.2 / (length - 1)) * otherreward[j]
-                        reward = -0.04 + 0.8 * highestreward + reward
-
-                    self.newcells.append(Cell(x, y, True, reward))
-                    reward = 0
-                    otherreward = []
-                    samereward = 0
-                    same = 0
-                    highestreward = 0
-
-        self.cells = self.newcells
-
-
-    def get_adjacent_cells(self, cell):
-        x = cell.x
-        y = cell.y
-        N = y - 1
-        S = y + 1
-        E = x + 1
-        W = x - 1
-        openN = self.walkable(x, N)
-        openS = self.walkable(x, S)
-        openE = self.walkable(E, y)
-        openW = self.walkable(W, y)
-        result = []
-        if openN:
-            result.append(self.get_cell(x, N))
-        if openS:
-            result.append(self.get_cell(x, S))
-        if openE:
-            result.append(self.get_cell(E, y))
-        if openW:
-            result.append(self.get_cell(W, y))
-        return result
-
-    def walkable(self, x, y):
-        cell = self.get_cell(x, y)
-        if cell is not None:
-            return cell.reachable
-        else:
-            return False
+        """ Does a single sweep of value iteration over all cells. """
+        return self.engine.sweep()
 
     def get_cell(self, x, y):
-        if -1 < x < 5 and -1 < y < 5:
-            return self.cells[x * 5 + y]
+        if -1 < x < self.width and -1 < y < self.height:
+            if self.engine.walls[x, y]:
+                return Cell(x, y, False, None)
+            return Cell(x, y, True, self.engine.values[x, y])
         else:
             return None
 
     def rightway(self):
         returns = Move.STRAIGHT
 
-        right_x, right_y = self.direction.get_new_direction(Move.RIGHT).get_xy_manipulation()
+        turns = new_directions[self.direction._value_]
+        right_x, right_y = xy_manipulations[turns[Move.RIGHT._value_]._value_]
         right_x = right_x + self.head_position[0]
         right_y = right_y + self.head_position[1]
-        straight_x, straight_y = self.direction.get_new_direction(Move.STRAIGHT).get_xy_manipulation()
+        straight_x, straight_y = xy_manipulations[turns[Move.STRAIGHT._value_]._value_]
         straight_x = straight_x + self.head_position[0]
         straight_y = straight_y + self.head_position[1]
-        left_x, left_y = self.direction.get_new_direction(Move.LEFT).get_xy_manipulation()
+        left_x, left_y = xy_manipulations[turns[Move.LEFT._value_]._value_]
         left_x = left_x + self.head_position[0]
         left_y = left_y + self.head_position[1]
 
@@ -228,8 +184,9 @@ class RL(object):
         allcells.append(leftcell)
         allcells.append(rightcell)
 
+        # any open cell is better than leaving the board, also when it can not reach food and its value is very low
         heighestcell = -1
-        heighestreward = -100
+        heighestreward = float('-inf')
 
         for i in range(0, 3):
             if allcells[i] is not None:
@@ -248,10 +205,5 @@ class RL(object):
         return returns
 
     def test(self):
-        self.cells = []
-        for y in range(5):
-            self.cells.append(Cell(y, 0, True, 500))
-            self.cells.append(Cell(y, 1, True, 400))
-            self.cells.append(Cell(y, 2, True, 300))
-            self.cells.append(Cell(y, 3, True, 200))
-            self.cells.append(Cell(y, 4, True, 100))
\ No newline at end of file
+        for y in range(self.height):
+            self.engine.values[:, y] = 100 * (self.height - y)
@@ -0,0 +1,288 @@
+"""
+Many games stepped at once with NumPy. The boards of all games are stacked in one int8 array of GameObject values,
+indexed [game, x, y] like the board itself, and the snakes are kept in arrays with an entry per game: head, direction,
+score and a ring buffer with the positions of the head. One call to step applies a move to every game.
+
+The rules are the ones of snake.py: the snake dies when it leaves the board or runs into a wall or its body, starves
+when enabled, and in this version of the game the game ends when the snake eats. With end_on_food=False the snake
+grows and a new food block spawns instead, like in the A search version. A finished game starts over right away on the
+same board, like Snake.reset does, or on a new board with reset_board=True.
+
+Run "python batchenv.py" to compare the number of steps per second with playing the games one by one.
+"""
+import random
+import time
+
+import numpy as np
+
+from gameobjects import GameObject
+from move import Direction, Move, xy_manipulations
+import headless
+
+""" BEGIN BATCH SETTINGS """
+# Number of games stepped at once when running this file directly
+nr_games = 4096
+# Board settings of the games
+board_width = 5
+board_height = 5
+food_blocks_max = 1
+wall_blocks_max = 1
+# Number of turns to starve, -1 for disabled
+starvation_tics = 25
+# Number of steps to time
+nr_steps = 1000
+""" END BATCH SETTINGS """
+
+WALL = GameObject.WALL.value
+FOOD = GameObject.FOOD.value
+EMPTY = GameObject.EMPTY.value
+SNAKE_HEAD = GameObject.SNAKE_HEAD.value
+SNAKE_BODY = GameObject.SNAKE_BODY.value
+
+# x and y manipulation of every Direction, indexed by Direction.value
+DX = np.array([man_x for man_x, man_y in xy_manipulations])
+DY = np.array([man_y for man_x, man_y in xy_manipulations])
+
+# GameObject of every value stored in the grids
+game_objects = [None] + [GameObject(value) for value in range(1, len(GameObject) + 1)]
+
+
+class BatchEnv:
+
+    def __init__(self, nr_games, board_width, board_height, food_blocks_max, wall_blocks_max, starvation_tics=-1,
+                 end_on_food=True, reset_board=False, seed=None):
+        """
+        :param end_on_food: True to end a game when the snake eats, like the game does in this version. False to let
+        the snake grow and spawn a new food block.
+
+        :param reset_board: True to give a finished game a new board with new walls and food, False to only place a new
+        snake on the board it was played on.
+
+        :param seed: Seed of the NumPy generator used for every random position.
+        """
+        self.nr_games = nr_games
+        self.width = board_width
+        self.height = board_height
+        self.food_blocks_max = food_blocks_max
+        self.wall_blocks_max = wall_blocks_max
+        self.starvation_tics = starvation_tics
+        self.end_on_food = end_on_food
+        self.reset_board = reset_board
+        self.rng = np.random.default_rng(seed)
+        self.games = np.arange(nr_games)
+        # walls never spawn next to the corners, like Board.wall_pos_not_allowed
+        self.wall_allowed = np.ones((board_width, board_height), dtype=bool)
+        for x, y in [(0, 1), (1, 0), (board_width - 2, 0), (board_width - 1, 1), (board_width - 1, board_height - 2),
+                     (board_width - 2, board_height - 1), (0, board_height - 2), (1, board_height - 1)]:
+            if 0 <= x < board_width and 0 <= y < board_height:
+                self.wall_allowed[x, y] = False
+
+        # the grids of all games one after the other, followed by a spare cell that takes the writes of the games
+        # that should not change a cell, so every write can be done for all games at once
+        size = board_width * board_height
+        self.cells = np.full(nr_games * size + 1, EMPTY, dtype=np.int8)
+        self.grid = self.cells[:-1].reshape(nr_games, board_width, board_height)
+        self.spare_cell = nr_games * size
+        self.grid_start = self.games * size
+        self.head_x = np.zeros(nr_games, dtype=np.int64)
+        self.head_y = np.zeros(nr_games, dtype=np.int64)
+        self.direction = np.zeros(nr_games, dtype=np.int64)
+        # number of body parts the snake should have and the number of cells it holds now, the head included
+        self.length = np.zeros(nr_games, dtype=np.int64)
+        self.count = np.zeros(nr_games, dtype=np.int64)
+        # positions of the head of every game as x * height + y, ring_head is the slot of the current head and the
+        # count - 1 slots before it are the body, head to tail
+        self.capacity = size + 1
+        self.ring = np.zeros((nr_games, self.capacity), dtype=np.int64)
+        self.ring_cells = self.ring.reshape(-1)
+        self.ring_start = self.games * self.capacity
+        self.ring_head = np.zeros(nr_games, dtype=np.int64)
+        self.score = np.zeros(nr_games, dtype=np.int64)
+        self.tics_alive = np.zeros(nr_games, dtype=np.int64)
+        self.tics_to_starve = np.full(nr_games, starvation_tics, dtype=np.int64)
+        self.new_boards(self.games)
+
+    def random_cells(self, allowed):
+        """
+        Picks a random allowed cell for every given grid.
+
+        :param allowed: Boolean array (games, width, height).
+
+        :return: Arrays with the x and y of the picked cell of every grid.
+        """
+        scores = np.where(allowed, self.rng.random(allowed.shape, dtype=np.float32), np.float32(-1)).reshape(
+            len(allowed), -1)
+        picks = scores.argmax(axis=1)
+        if (scores[np.arange(len(allowed)), picks] < 0).any():
+            raise RuntimeError("Congratulations, you broke the game by filling each cell of the board!")
+        return np.unravel_index(picks, allowed.shape[1:])
+
+    def new_boards(self, games):
+        """ Gives the given games a new board with a new snake, the way Snake and Board set up a game. """
+        grid = np.full((len(games), self.width, self.height), EMPTY, dtype=np.int8)
+        rows = np.arange(len(games))
+        head_x, head_y = self.random_cells(grid == EMPTY)
+        grid[rows, head_x, head_y] = SNAKE_HEAD
+        for i in range(self.wall_blocks_max):
+            x, y = self.random_cells((grid == EMPTY) & self.wall_allowed)
+            grid[rows, x, y] = WALL
+        for i in range(self.food_blocks_max):
+            x, y = self.random_cells(grid == EMPTY)
+            grid[rows, x, y] = FOOD
+        self.grid[games] = grid
+        self.place_snakes(games, head_x, head_y)
+
+    def reset_snakes(self, games):
+        """ Removes the snakes of the given games and places a new one on a free cell, like Snake.reset. """
+        grid = self.grid[games]
+        # the new position is picked before the old snake is removed, as Snake.reset does
+        head_x, head_y = self.random_cells(grid == EMPTY)
+        grid[grid >= SNAKE_HEAD] = EMPTY
+        grid[np.arange(len(games)), head_x, head_y] = SNAKE_HEAD
+        self.grid[games] = grid
+        self.place_snakes(games, head_x, head_y)
+
+    def place_snakes(self, games, head_x, head_y):
+        self.head_x[games] = head_x
+        self.head_y[games] = head_y
+        self.direction[games] = Direction.NORTH.value
+        self.length[games] = 0
+        self.count[games] = 1
+        self.ring_head[games] = 0
+        self.ring[games, 0] = head_x * self.height + head_y
+        self.score[games] = 0
+        self.tics_alive[games] = 0
+        self.tics_to_starve[games] = self.starvation_tics
+
+    def step(self, moves):
+        """
+        Applies a move to every game. Finished games are started over before returning.
+
+        :param moves: Array with the Move value (-1 left, 0 straight, 1 right) for every game.
+
+        :return: A tuple (done, score, turns) of arrays with an entry per game: whether the game finished this step, and
+        the score and the number of turns of the finished games.
+        """
+        games = self.games
+        height = self.height
+        moves = np.asarray(moves)
+        if self.starvation_tics != -1:
+            starved = self.tics_to_starve == 0
+        else:
+            starved = np.zeros(self.nr_games, dtype=bool)
+        # games that end this step are started over at the end, so their snake is moved along with the others
+        self.direction = (self.direction + moves) % 4
+        new_x = self.head_x + DX[self.direction]
+        new_y = self.head_y + DY[self.direction]
+
+        # the tail moves away first, unless the snake ate last turn
+        pop = self.count > self.length
+        tail = self.ring_cells[self.ring_start + (self.ring_head - self.count + 1) % self.capacity]
+        self.cells[np.where(pop, self.grid_start + tail, self.spare_cell)] = EMPTY
+        self.count -= pop
+        # the cell of the head becomes body when the body follows the head into it
+        leave = self.count > 0
+        self.cells[np.where(leave, self.grid_start + self.head_x * height + self.head_y, self.spare_cell)] = SNAKE_BODY
+
+        inside = (new_x >= 0) & (new_x < self.width) & (new_y >= 0) & (new_y < height)
+        target = np.where(inside, self.grid_start + new_x * height + new_y, self.spare_cell)
+        cell = self.cells[target]
+        died = ~inside | (cell == WALL) | (cell == SNAKE_BODY)
+        ate = ~starved & ~died & (cell == FOOD)
+        self.score += ate
+        done = starved | died
+        if self.end_on_food:
+            done |= ate
+        live = ~done
+
+        self.cells[np.where(live, target, self.spare_cell)] = SNAKE_HEAD
+        self.head_x = new_x
+        self.head_y = new_y
+        self.ring_head = (self.ring_head + 1) % self.capacity
+        self.ring_cells[self.ring_start + self.ring_head] = new_x * height + new_y
+        self.count += 1
+        grow = live & ate
+        self.length += grow
+        if grow.any():
+            fed = games[grow]
+            x, y = self.random_cells(self.grid[fed] == EMPTY)
+            self.grid[fed, x, y] = FOOD
+        self.tics_alive += live
+        if self.starvation_tics != -1:
+            self.tics_to_starve = np.where(grow, self.starvation_tics, self.tics_to_starve - live)
+
+        score = self.score.copy()
+        turns = self.tics_alive.copy()
+        if done.any():
+            if self.reset_board:
+                self.new_boards(games[done])
+            else:
+                self.reset_snakes(games[done])
+        return done, score, turns
+
+    def get_copy(self, game):
+        """ :return: The board of one game as a list of columns of GameObjects, like Board.get_copy. """
+        return [[game_objects[value] for value in column] for column in self.grid[game].tolist()]
+
+    def get_head_position(self, game):
+        return int(self.head_x[game]), int(self.head_y[game])
+
+    def get_direction(self, game):
+        return Direction(int(self.direction[game]))
+
+    def get_body_parts(self, game):
+        """ :return: The body of one game in head to tail order, like Snake.body_parts. """
+        slots = (self.ring_head[game] - np.arange(1, self.count[game])) % self.capacity
+        return [divmod(int(cell), self.height) for cell in self.ring[game, slots]]
+
+
+class RandomAgent:
+    """ Agent making random moves, used to time the game itself. """
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def get_move(self, board, score, turns_alive, turns_to_starve, direction, head_position, body_parts):
+        return (Move.LEFT, Move.STRAIGHT, Move.RIGHT)[self.rng.randrange(3)]
+
+    def should_redraw_board(self):
+        return False
+
+    def should_grow_on_food_collision(self):
+        return True
+
+    def on_die(self, head_position, board, score, body_parts):
+        pass
+
+
+def main():
+    snake, board = headless.new_game(board_width, board_height, food_blocks_max, wall_blocks_max, False,
+                                     starvation_tics, RandomAgent(random.Random(0)), seed=0)
+    start = time.perf_counter()
+    steps = 0
+    while time.perf_counter() - start < 1:
+        for i in range(1000):
+            died, redraw_board = snake.update(board)
+            if died:
+                snake.reset(board, False, True)
+        steps += 1000
+    single = steps / (time.perf_counter() - start)
+    print("One by one: {:.0f} steps per second".format(single))
+
+    env = BatchEnv(nr_games, board_width, board_height, food_blocks_max, wall_blocks_max, starvation_tics, seed=0)
+    rng = np.random.default_rng(0)
+    moves = rng.integers(-1, 2, size=(nr_steps, nr_games))
+    games = 0
+    score = 0
+    start = time.perf_counter()
+    for i in range(nr_steps):
+        done, scores, turns = env.step(moves[i])
+        games += done.sum()
+        score += scores[done].sum()
+    batch = nr_steps * nr_games / (time.perf_counter() - start)
+    print("Batch of {}: {:.0f} steps per second ({:.0f}x), {} games, mean score {:.3f}".format(
+        nr_games, batch, batch / single, games, score / max(games, 1)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+from gameobjects import GameObject
+
+WALL = GameObject.WALL.value
+FOOD = GameObject.FOOD.value
+EMPTY = GameObject.EMPTY.value
+SNAKE_HEAD = GameObject.SNAKE_HEAD.value
+SNAKE_BODY = GameObject.SNAKE_BODY.value
+
+# GameObject of every value stored in the cells
+game_objects = {game_object.value: game_object for game_object in GameObject}
+
+
+class GridState:
+    """
+    The grid of a board as a bytearray with the GameObject value of every cell, cell (x, y) at index x * height + y
+    like the flat arrays of the A* agent. A 200x200 board takes 40 kB and a snapshot is a single copy of the bytes.
+
+    Sets of cells are handled as bitboards: Python ints with bit x * height + y set for every cell in the set. They are
+    built from the bytes in one pass and support neighbor masks and flood fills with a few shifts per step.
+    """
+
+    def __init__(self, width, height, cells=None):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.cells = bytearray([EMPTY]) * self.size if cells is None else bytearray(cells)
+        # all cells, the cells that are not in the first row (y = 0) and the cells not in the last row (y = height - 1)
+        self.all_cells = (1 << self.size) - 1
+        self.not_first_row = int(("1" * (height - 1) + "0") * width, 2)
+        self.not_last_row = int(("0" + "1" * (height - 1)) * width, 2)
+        # translation tables of bytes.translate per set of values and the two bytes they turn the cells into
+        self.tables = {}
+
+    def get(self, x, y):
+        return game_objects[self.cells[x * self.height + y]]
+
+    def set(self, x, y, game_object):
+        self.cells[x * self.height + y] = game_object.value
+
+    def is_blocked(self, x, y):
+        """ :return: True if the cell holds a wall or a body part, the objects the snake dies on. """
+        value = self.cells[x * self.height + y]
+        return value == WALL or value == SNAKE_BODY
+
+    def snapshot(self):
+        """ :return: An immutable copy of the cells, use restore to go back to it. """
+        return bytes(self.cells)
+
+    def restore(self, snapshot):
+        self.cells[:] = snapshot
+
+    def copy(self):
+        return GridState(self.width, self.height, self.cells)
+
+    def translate(self, objects, inside, outside):
+        """ :return: The cells with the given game objects replaced by the byte inside and all others by outside. """
+        key = (frozenset(game_object.value for game_object in objects), inside, outside)
+        table = self.tables.get(key)
+        if table is None:
+            table = self.tables[key] = bytes(inside if value in key[0] else outside for value in range(256))
+        return self.cells.translate(table)
+
+    def mask(self, *objects):
+        """ :return: A bytearray with a 1 for every cell holding one of the given game objects and a 0 elsewhere. """
+        return self.translate(objects, 1, 0)
+
+    def bitboard(self, *objects):
+        """ :return: A bitboard of the cells holding one of the given game objects. """
+        # int() reads the most significant bit first, so the last cell goes first
+        return int(self.translate(objects, ord("1"), ord("0"))[::-1], 2)
+
+    def neighbors(self, bits):
+        """ :return: A bitboard of the cells next to a cell of bits, in one of the four directions. """
+        return ((bits << 1) & self.not_first_row) | ((bits >> 1) & self.not_last_row) \
+            | ((bits << self.height) & self.all_cells) | (bits >> self.height)
+
+    def flood_fill(self, start, open_cells):
+        """
+        :param start: Bitboard of the cells to start from. They do not have to be open themselves.
+
+        :param open_cells: Bitboard of the cells that can be entered.
+
+        :return: A bitboard of the start cells and all open cells connected to them.
+        """
+        reached = start
+        while True:
+            grown = reached | (self.neighbors(reached) & open_cells)
+            if grown == reached:
+                return reached
+            reached = grown
+
+    def reachable(self, x, y):
+        """ :return: A bitboard of the cells that can be walked to from (x, y) without hitting a wall or body part. """
+        start = 1 << (x * self.height + y)
+        return self.flood_fill(start, self.all_cells & ~self.bitboard(GameObject.WALL, GameObject.SNAKE_BODY,
+                                                                      GameObject.SNAKE_HEAD)) & ~start
+
+    @staticmethod
+    def count(bits):
+        return bin(bits).count("1")
+
+    def positions(self, bits):
+        """ :return: The (x, y) of every cell of the bitboard. """
+        positions = []
+        while bits:
+            low = bits & -bits
+            positions.append(divmod(low.bit_length() - 1, self.height))
+            bits ^= low
+        return positions
+
+
+class ReadOnlyGridState:
+    """
+    The reading side of a GridState, handed to the agents with the board so they can not change the game through it.
+    The cells themselves are only exported as a read-only memoryview, find, translate and mask give new bytes.
+    """
+
+    def __init__(self, state):
+        self._state = state
+        self.width = state.width
+        self.height = state.height
+        self.size = state.size
+
+    def get(self, x, y):
+        return self._state.get(x, y)
+
+    def is_blocked(self, x, y):
+        return self._state.is_blocked(x, y)
+
+    def find(self, value, start=0):
+        """ :return: The index of the first cell from start on with the given value, -1 when there is none. """
+        return self._state.cells.find(value, start)
+
+    def buffer(self):
+        """ :return: A read-only memoryview of the cells, to read them without a copy, like with np.frombuffer. """
+        return memoryview(self._state.cells).toreadonly()
+
+    def snapshot(self):
+        return self._state.snapshot()
+
+    def translate(self, objects, inside, outside):
+        return self._state.translate(objects, inside, outside)
+
+    def mask(self, *objects):
+        return self._state.mask(*objects)
+
+    def bitboard(self, *objects):
+        return self._state.bitboard(*objects)
+
+    def reachable(self, x, y):
+        return self._state.reachable(x, y)
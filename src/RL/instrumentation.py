@@ -0,0 +1,151 @@
+from time import perf_counter_ns
+import csv
+import json
+
+
+class Histogram:
+    """
+    Streaming latency histogram. Samples are counted in logarithmic buckets that are at most 1/16th of their value
+    wide, so percentiles are accurate to about 6% while the memory used does not grow with the number of samples.
+    """
+
+    # number of bits of a sample kept in its bucket key
+    precision = 5
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, ns):
+        shift = max(ns.bit_length() - self.precision, 0)
+        key = (shift, ns >> shift)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+        self.count += 1
+        self.total += ns
+        if self.min is None or ns < self.min:
+            self.min = ns
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, p):
+        """
+        :param p: The percentile to compute, between 0 and 100.
+
+        :return: The upper bound of the bucket holding the given percentile in nanoseconds, None if nothing has been
+        recorded.
+        """
+        rank = p / 100 * self.count
+        seen = 0
+        for shift, value in sorted(self.buckets):
+            seen += self.buckets[(shift, value)]
+            if seen >= rank:
+                return min(((value + 1) << shift) - 1, self.max)
+        return None
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ns': self.total // self.count if self.count > 0 else None,
+            'min_ns': self.min,
+            'p50_ns': self.percentile(50),
+            'p95_ns': self.percentile(95),
+            'p99_ns': self.percentile(99),
+            'max_ns': self.max,
+        }
+
+
+class Timer:
+    """ Context manager recording the time spent in its block into a histogram. """
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = 0
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.record(perf_counter_ns() - self.start)
+        return False
+
+
+class NoTimer:
+    """ Context manager that does nothing, handed out by a disabled Instrumentation. """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+no_timer = NoTimer()
+
+
+class Instrumentation:
+    """
+    Latency histograms per measured operation and board size. It is disabled until enable is called, before that
+    timer returns a shared NoTimer so the timed code only pays for a method call and an empty with block.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {}
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def histogram(self, name, board_width, board_height):
+        key = (name, board_width, board_height)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        return histogram
+
+    def timer(self, name, board_width, board_height):
+        """
+        Used to time a block of code: "with instrumentation.timer('Board.draw', width, height): ..."
+        """
+        if not self.enabled:
+            return no_timer
+        return Timer(self.histogram(name, board_width, board_height))
+
+    def record(self, name, board_width, board_height, ns):
+        self.histogram(name, board_width, board_height).record(ns)
+
+    def clear(self):
+        self.histograms = {}
+
+    def summary(self):
+        """
+        :return: A list with a dictionary per operation and board size holding the count, mean, min, p50, p95, p99 and
+        max latency in nanoseconds.
+        """
+        rows = []
+        for (name, board_width, board_height), histogram in sorted(self.histograms.items()):
+            row = {'name': name, 'board_size': "{}x{}".format(board_width, board_height)}
+            row.update(histogram.summary())
+            rows.append(row)
+        return rows
+
+    def export(self, path):
+        """
+        Writes the summary to the given path, as CSV when the path ends with .csv and as JSON otherwise.
+        """
+        rows = self.summary()
+        with open(path, 'w', newline='') as file:
+            if path.endswith('.csv'):
+                writer = csv.DictWriter(file, fieldnames=['name', 'board_size', 'count', 'mean_ns', 'min_ns', 'p50_ns',
+                                                          'p95_ns', 'p99_ns', 'max_ns'])
+                writer.writeheader()
+                writer.writerows(rows)
+            else:
+                json.dump(rows, file, indent=2)
+
+
+# instrumentation shared by the board, the snake and the agent
+instrumentation = Instrumentation()
@@ -1,6 +1,10 @@
 from tkinter import *
+import time
+
 from snake import Snake
 from board import Board
+from instrumentation import instrumentation
+from randomstream import RandomStream
 
 
 root = None
@@ -10,6 +14,11 @@ canvas_width = 800
 canvas_height = 800
 
 tics_per_second = 4
+# maximum number of times per second the board is drawn, independent of the number of turns per second
+frames_per_second = 60
+# time of the previous frame and the number of turns that are due but not simulated yet
+last_frame_time = 0
+tick_backlog = 0
 previous_text_drawn = False
 
 """ BEGIN GAME SETTINGS """
@@ -24,6 +33,10 @@ wall_blocks_max = 1
 test_config = False
 # Number of turns to starve, -1 for disabled
 starvation_tics = -1
+# File to write the latency histograms to when the game is closed (.json or .csv), None to not measure them
+latency_report = None
+# Seed of the game, None for a different game on every run
+seed = None
 # indicates whether when not redrawing the board, the score should be printed to the console.
 print_score_not_on_non_redraw = True
 """ END GAME SETTINGS """
@@ -38,7 +51,7 @@ def callback():
 
 
 def main():
-    global root, canvas, canvas_height, canvas_width, board, snake, scale
+    global root, canvas, canvas_height, canvas_width, board, snake, scale, last_frame_time
     root = Tk()
     root.title("Snake")
     canvas = Canvas(root, width=canvas_width, height=canvas_height)
@@ -50,40 +63,77 @@ def main():
     scale.pack(side=LEFT)
     b = Button(root, text="Next Step", command=callback)
     b.pack()
-    snake = Snake(board_width, board_height, starvation_tics)
+    if latency_report is not None:
+        instrumentation.enable()
+    rng = None if seed is None else RandomStream(seed)
+    snake = Snake(board_width, board_height, starvation_tics, rng=rng)
     board = Board(board_width, board_height, canvas_width, canvas_height, snake, food_blocks_max, wall_blocks_max,
-                  test_config)
+                  test_config, rng)
     board.draw(canvas)
-    canvas.after(int(1000 / tics_per_second), game_loop)
+    last_frame_time = time.perf_counter()
+    canvas.after(int(1000 / frames_per_second), game_loop)
     mainloop()
+    if latency_report is not None:
+        instrumentation.export(latency_report)
 
 
 def game_loop():
-    global canvas, tics_per_second
+    """
+    Runs once per frame. The ticks the slider asks for since the previous frame are simulated first, for at most one
+    frame of time, after which the board is drawn once. Ticks that do not fit are dropped, so a slow agent slows the
+    game down instead of freezing the window.
+    """
+    global canvas, tics_per_second, last_frame_time, tick_backlog
+    now = time.perf_counter()
     if tics_per_second > 0:
-        update()
-        canvas.after(int(1000 / tics_per_second), game_loop)
+        tick_backlog += (now - last_frame_time) * tics_per_second
+        if tick_backlog >= 1:
+            deadline = now + 1 / frames_per_second
+            redraw_board = False
+            while tick_backlog >= 1:
+                tick_backlog -= 1
+                redraw_board = step()
+                if time.perf_counter() > deadline:
+                    tick_backlog = 0
+            draw(redraw_board)
     else:
-        canvas.after(int(1000), game_loop)
+        tick_backlog = 0
+    last_frame_time = now
+    frame_time = time.perf_counter() - now
+    canvas.after(max(1, int(1000 * (1 / frames_per_second - frame_time))), game_loop)
 
 
 def update():
-    global tics_per_second, board, snake, canvas, previous_text_drawn, print_score_not_on_non_redraw
+    draw(step())
+
+
+def step():
+    """
+    Simulates a single turn.
 
-    # update gamestate
+    :return: True if the agent wants the board to be redrawn.
+    """
+    global board, snake, print_score_not_on_non_redraw
     result = snake.update(board)
     if result[0]:
         snake.reset(board, result[1], print_score_not_on_non_redraw)
+    return result[1]
 
-    if result[1]:
-        # clear canvas
-        canvas.delete("all")
-        # draw new state
+
+def draw(redraw_board):
+    global board, canvas, previous_text_drawn
+    if redraw_board:
+        # remove the text, the cells are drawn again from scratch after it
+        if previous_text_drawn:
+            canvas.delete("all")
+            board.clear_drawing()
+        # draw the cells that changed
         board.draw(canvas)
         previous_text_drawn = False
     elif not previous_text_drawn:
         previous_text_drawn = True
         canvas.delete("all")
+        board.clear_drawing()
         canvas.create_text(canvas_width/2, canvas_height/2, fill="darkblue", font="Times 20 bold", justify="center",
                            text="Currently not redrawing the board \nStill use slider to determine game speed!!!")
 
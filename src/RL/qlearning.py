@@ -0,0 +1,247 @@
+"""
+Tabular Q-learning for the snake. The agent only looks at its surroundings: the direction of the nearest food relative
+to its heading, whether the cells straight ahead, to the left and to the right are deadly, and its heading. These are
+packed into a small integer, so the Q-values fit in a NumPy array with a row per state and a column per move.
+
+Run "python qlearning.py" to train headless on the board settings below. The table is written to the checkpoint file
+every checkpoint_every episodes and training continues from that file when it already exists. To let the trained
+snake play, create a QAgent(QTable.load(checkpoint_file), epsilon=0, learn=False) and hand it to the Snake.
+"""
+import os
+import random
+import struct
+import time
+
+import numpy as np
+
+from gameobjects import GameObject
+from move import Move, new_directions, xy_manipulations
+import headless
+
+""" BEGIN TRAINING SETTINGS """
+# Number of episodes (games) to train when running this file directly
+nr_episodes = 200000
+# Board settings of the training games
+board_width = 5
+board_height = 5
+food_blocks_max = 1
+wall_blocks_max = 1
+starvation_tics = 25
+# Rewards for eating, dying and every other move
+food_reward = 1.0
+death_reward = -1.0
+step_reward = -0.04
+# Learning rate and discount factor
+alpha = 0.1
+gamma = 0.9
+# Chance of a random move, multiplied by epsilon_decay after every episode until it reaches epsilon_min
+epsilon = 1.0
+epsilon_decay = 0.9999
+epsilon_min = 0.01
+# File the table is written to and read from, None to not keep the table
+checkpoint_file = "qtable.bin"
+checkpoint_every = 10000
+# Episode i of the training is played on a board seeded with first_seed + i
+first_seed = 0
+# Seed of the random moves made while exploring
+seed = 0
+""" END TRAINING SETTINGS """
+
+# moves in the order of the columns of the table
+moves = (Move.LEFT, Move.STRAIGHT, Move.RIGHT)
+
+# number of states: 3 x 3 signs of the food position ahead and to the right, 8 danger combinations and 4 headings
+nr_states = 3 * 3 * 8 * 4
+
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+
+def is_deadly(board, x, y):
+    if x < 0 or y < 0 or x >= len(board) or y >= len(board[0]):
+        return True
+    game_object = board[x][y]
+    return game_object == GameObject.WALL or game_object == GameObject.SNAKE_BODY
+
+
+def nearest_food(board, head_position):
+    """ :return: (x, y) of the food closest to the head in Manhattan distance, None when there is no food. """
+    head_x, head_y = head_position
+    nearest = None
+    nearest_distance = None
+    for x, column in enumerate(board):
+        for y, game_object in enumerate(column):
+            if game_object == GameObject.FOOD:
+                distance = abs(x - head_x) + abs(y - head_y)
+                if nearest is None or distance < nearest_distance:
+                    nearest = (x, y)
+                    nearest_distance = distance
+    return nearest
+
+
+def encode_state(board, direction, head_position):
+    """
+    Packs the view of the snake into an integer between 0 and nr_states.
+
+    :return: (food ahead sign * 3 + food right sign) * 32 + danger bits * 4 + heading, where the danger bits are 1 for
+    left, 2 for straight and 4 for right, and the signs are shifted from -1..1 to 0..2.
+    """
+    head_x, head_y = head_position
+    turns = new_directions[direction._value_]
+    ahead_x, ahead_y = xy_manipulations[direction._value_]
+    right_x, right_y = xy_manipulations[turns[Move.RIGHT._value_]._value_]
+    food = nearest_food(board, head_position)
+    if food is None:
+        ahead, right = 0, 0
+    else:
+        delta_x, delta_y = food[0] - head_x, food[1] - head_y
+        ahead = sign(delta_x * ahead_x + delta_y * ahead_y)
+        right = sign(delta_x * right_x + delta_y * right_y)
+    danger = 0
+    for bit, move in enumerate(moves):
+        man_x, man_y = xy_manipulations[turns[move._value_]._value_]
+        if is_deadly(board, head_x + man_x, head_y + man_y):
+            danger |= 1 << bit
+    return ((ahead + 1) * 3 + right + 1) * 32 + danger * 4 + direction._value_
+
+
+class QTable:
+    """
+    Q-values in a float64 array of nr_states rows and a column per move, together with the number of episodes they
+    were trained on.
+
+    The checkpoint format is a 16 byte little endian header (magic b"QTBL", version, number of states, number of
+    moves, all uint16 after the magic, followed by the uint32 number of episodes) and the raw table.
+    """
+
+    magic = b"QTBL"
+    version = 1
+    header = struct.Struct("<4sHHHxxI")
+
+    def __init__(self, values=None, episodes=0):
+        self.values = np.zeros((nr_states, len(moves))) if values is None else values
+        self.episodes = episodes
+
+    def save(self, path):
+        """ Writes the table to a temporary file first, so an interrupted save never corrupts the checkpoint. """
+        rows, columns = self.values.shape
+        temporary = path + ".tmp"
+        with open(temporary, 'wb') as file:
+            file.write(self.header.pack(self.magic, self.version, rows, columns, self.episodes))
+            file.write(self.values.astype('<f8', copy=False).tobytes())
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            data = file.read()
+        magic, version, rows, columns, episodes = cls.header.unpack_from(data)
+        if magic != cls.magic or version != cls.version:
+            raise ValueError("{} is not a Q-table checkpoint of version {}".format(path, cls.version))
+        if (rows, columns) != (nr_states, len(moves)):
+            raise ValueError("{} holds a {}x{} table, expected {}x{}".format(path, rows, columns, nr_states,
+                                                                               len(moves)))
+        values = np.frombuffer(data, dtype='<f8', offset=cls.header.size).reshape(rows, columns).copy()
+        return cls(values, episodes)
+
+
+class QAgent:
+    """
+    Agent with the interface of agent.Agent that picks its moves from a QTable and, when learning, updates the table
+    after every move with the one step Q-learning rule.
+    """
+
+    def __init__(self, table, epsilon=epsilon, learn=True, rng=None):
+        """
+        :param epsilon: Chance of a random move. It decays after every episode while learning.
+
+        :param learn: False to only play the moves of the table without changing it.
+
+        :param rng: random.Random used for the exploration, so the random numbers of the game itself are left alone.
+        """
+        self.table = table
+        self.epsilon = epsilon
+        self.learn = learn
+        self.rng = random.Random(seed) if rng is None else rng
+        self.state = None
+        self.action = None
+        self.score = 0
+
+    def update(self, reward, state):
+        """ Moves the value of the previous state and move towards the reward plus the best value of the new state. """
+        if self.state is None:
+            return
+        target = reward if state is None else reward + gamma * self.table.values[state].max()
+        self.table.values[self.state, self.action] += alpha * (target - self.table.values[self.state, self.action])
+
+    def get_move(self, board, score, turns_alive, turns_to_starve, direction, head_position, body_parts):
+        state = encode_state(board, direction, head_position)
+        if self.learn:
+            self.update(food_reward if score > self.score else step_reward, state)
+        if self.rng.random() < self.epsilon:
+            action = self.rng.randrange(len(moves))
+        else:
+            action = int(self.table.values[state].argmax())
+        self.state = state
+        self.action = action
+        self.score = score
+        return moves[action]
+
+    def should_redraw_board(self):
+        return not self.learn
+
+    def should_grow_on_food_collision(self):
+        return True
+
+    def on_die(self, head_position, board, score, body_parts):
+        if self.learn:
+            # eating ends the game in this version, so a higher score means the last move found food
+            self.update(food_reward if score > self.score else death_reward, None)
+            self.table.episodes += 1
+            self.epsilon = max(epsilon_min, self.epsilon * epsilon_decay)
+        self.state = None
+        self.action = None
+        self.score = 0
+
+
+def train(table, nr_episodes, agent=None, checkpoint_file=checkpoint_file, checkpoint_every=checkpoint_every):
+    """
+    Trains the table on nr_episodes headless games with the board settings of this file, writing a checkpoint every
+    checkpoint_every episodes and after the last one. Every episode is played on a new board: eating ends the game in
+    this version and the food stays where it was, so a single board would only ever show one food position. The boards
+    are seeded with the episode number, so training continued from a checkpoint goes on with new boards.
+
+    :return: The agent used, holding the trained table and the decayed epsilon.
+    """
+    if agent is None:
+        agent = QAgent(table, max(epsilon_min, epsilon * epsilon_decay ** table.episodes))
+    played = 0
+    while played < nr_episodes:
+        start = time.perf_counter()
+        results = []
+        for episode in range(min(checkpoint_every, nr_episodes - played)):
+            snake, board = headless.new_game(board_width, board_height, food_blocks_max, wall_blocks_max, False,
+                                             starvation_tics, agent, seed=first_seed + table.episodes)
+            results.extend(headless.play(snake, board, 1))
+        duration = time.perf_counter() - start
+        played += len(results)
+        print("Episodes: {}. Mean score: {:.3f}. Epsilon: {:.3f}. {:.0f} episodes per second".format(
+            table.episodes, sum(result.score for result in results) / len(results), agent.epsilon,
+            len(results) / duration))
+        if checkpoint_file is not None:
+            table.save(checkpoint_file)
+    return agent
+
+
+def main():
+    if checkpoint_file is not None and os.path.exists(checkpoint_file):
+        table = QTable.load(checkpoint_file)
+        print("Continuing from {} episodes in {}".format(table.episodes, checkpoint_file))
+    else:
+        table = QTable()
+    train(table, nr_episodes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+from collections import Counter, namedtuple
+from multiprocessing import Pool, cpu_count
+import io
+import time
+
+from replay import Recorder
+import headless
+
+BoardConfig = namedtuple('BoardConfig', ['board_width', 'board_height', 'food_blocks_max', 'wall_blocks_max',
+                                         'starvation_tics'])
+
+""" BEGIN TOURNAMENT SETTINGS """
+# Board configurations to evaluate the agent on
+configs = [
+    BoardConfig(5, 5, 1, 1, -1),
+    BoardConfig(5, 5, 2, 1, 25),
+]
+# Number of seeded games per board configuration, game i is played with seed first_seed + i
+nr_games = 1000
+first_seed = 0
+# Number of seeds handed to a worker at once. Smaller chunks balance better, larger chunks have less overhead
+chunk_size = 16
+# Number of worker processes, None for one per core
+nr_processes = None
+# File to append a replay of every game to, with the seed it was played with, None to not record them
+replay_file = None
+# Number of turns after which a game is ended as if the snake died, None to play until the snake dies
+max_turns = 100000
+""" END TOURNAMENT SETTINGS """
+
+
+class Distribution:
+    """ Score and turn distribution of the games played on one board configuration. """
+
+    def __init__(self):
+        self.scores = Counter()
+        self.turns = Counter()
+        # number of games ended by max_turns
+        self.capped = 0
+
+    def add(self, result):
+        self.scores[result.score] += 1
+        self.turns[result.turns] += 1
+        self.capped += result.capped
+
+    def merge(self, other):
+        self.scores.update(other.scores)
+        self.turns.update(other.turns)
+        self.capped += other.capped
+
+    def nr_games(self):
+        return sum(self.scores.values())
+
+    def summary(self):
+        return "games: {}, score mean {:.2f} p50 {} p95 {} max {}, turns mean {:.2f} p50 {} p95 {} max {}, capped {}" \
+            .format(self.nr_games(), mean(self.scores), percentile(self.scores, 50), percentile(self.scores, 95),
+                    max(self.scores), mean(self.turns), percentile(self.turns, 50), percentile(self.turns, 95),
+                    max(self.turns), self.capped)
+
+
+def mean(counter):
+    return sum(value * count for value, count in counter.items()) / sum(counter.values())
+
+
+def percentile(counter, p):
+    rank = p / 100 * sum(counter.values())
+    seen = 0
+    for value in sorted(counter):
+        seen += counter[value]
+        if seen >= rank:
+            return value
+    return None
+
+
+def play_seeds(job):
+    """
+    Worker function: plays one fresh game per seed of the job and returns the distribution of the results.
+
+    :param job: A tuple (config index, BoardConfig, first seed, last seed exclusive, whether to record the games,
+    max_turns of headless.play).
+
+    :return: A tuple (config index, Distribution, the replay records of the games or None).
+    """
+    index, config, seed_start, seed_stop, record, max_turns = job
+    distribution = Distribution()
+    # the records are collected in memory and written by the main process, so the workers never share the file
+    records = io.BytesIO() if record else None
+    recorder = Recorder(records) if record else None
+    for seed in range(seed_start, seed_stop):
+        snake, board = headless.new_game(config.board_width, config.board_height, config.food_blocks_max,
+                                         config.wall_blocks_max, False, config.starvation_tics, recorder=recorder,
+                                         seed=seed)
+        distribution.add(headless.play(snake, board, 1, max_turns)[0])
+    return index, distribution, records.getvalue() if record else None
+
+
+def make_jobs(configs, nr_games, first_seed, chunk_size, record=False, max_turns=None):
+    jobs = []
+    for index, config in enumerate(configs):
+        for seed in range(first_seed, first_seed + nr_games, chunk_size):
+            jobs.append((index, config, seed, min(seed + chunk_size, first_seed + nr_games), record,
+                         max_turns))
+    return jobs
+
+
+def run_tournament(configs, nr_games, first_seed=0, chunk_size=chunk_size, nr_processes=None, replay_file=None,
+                   max_turns=None):
+    """
+    Plays nr_games seeded games for every board configuration, spread over a pool of worker processes.
+
+    :param replay_file: File to append the replays of all games to, None to not record them. The records are in the
+    order the chunks finish, each record holds its seed.
+
+    :param max_turns: Number of turns after which a game is ended as if the snake died, None to play every game until
+    the snake dies.
+
+    :return: A list with the merged Distribution for each configuration, in the order of configs.
+    """
+    distributions = [Distribution() for config in configs]
+    jobs = make_jobs(configs, nr_games, first_seed, chunk_size, replay_file is not None, max_turns)
+    file = open(replay_file, 'ab') if replay_file is not None else None
+    try:
+        with Pool(nr_processes or cpu_count()) as pool:
+            for index, distribution, records in pool.imap_unordered(play_seeds, jobs):
+                distributions[index].merge(distribution)
+                if file is not None:
+                    file.write(records)
+    finally:
+        if file is not None:
+            file.close()
+    return distributions
+
+
+def main():
+    start = time.perf_counter()
+    distributions = run_tournament(configs, nr_games, first_seed, chunk_size, nr_processes, replay_file, max_turns)
+    for config, distribution in zip(configs, distributions):
+        print("{}: {}".format(config, distribution.summary()))
+    print("Took {:.2f} seconds".format(time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import time
+
+import numpy as np
+
+
+class ValueIteration:
+    """
+    Value iteration over the board with NumPy arrays indexed [x, y]. Food cells are worth 1, walls can not be entered
+    and every other cell is worth the step reward plus 80% of its best neighbor and 20% of the mean of its other
+    neighbors. A sweep computes the new values of all cells at once from shifted copies of the value array.
+
+    The values are kept between solves. Only the cells in the active mask are swept: all cells for a new board, the
+    cells around a changed food block after set_food, and after every sweep the neighbors of the cells whose value
+    changed more than the tolerance. Solving stops when nothing is active anymore.
+    """
+
+    step_reward = -0.04
+    best_weight = 0.8
+    # value of walls and of the border when taking the maximum of the neighbors, low enough to never be the best
+    blocked_value = -1e9
+
+    def __init__(self, walls, food, tolerance=1e-4, max_sweeps=1000):
+        """
+        :param walls: Two dimensional boolean array, True where there is a wall.
+
+        :param food: Two dimensional boolean array, True where there is food.
+        """
+        self.walls = walls
+        self.food = food
+        self.tolerance = tolerance
+        self.max_sweeps = max_sweeps
+        width, height = walls.shape
+        self.open = ~walls
+        # cells from which no food can be reached get a value below any path to food and are never swept
+        self.unreachable_value = self.step_reward * walls.size
+        # padded copies of the values, the border and the walls are 0 for the sums and blocked_value for the maxima.
+        # The values are a view on the first one
+        self.padded_sum = np.zeros((width + 2, height + 2))
+        self.padded_max = np.full((width + 2, height + 2), self.blocked_value)
+        self.values = self.padded_sum[1:-1, 1:-1]
+        padded_open = np.zeros((width + 2, height + 2), dtype=bool)
+        padded_open[1:-1, 1:-1] = self.open
+        count = np.zeros((width, height), dtype=int)
+        for neighbor in self.neighbors(padded_open):
+            count += neighbor
+        # 0.8 * best + 0.2 * (total - best) / (count - 1) written as best_factor * best + total_factor * total, where a
+        # single neighbor gets everything and a cell without neighbors only gets the step reward
+        others = np.maximum(count - 1, 1)
+        self.best_factor = np.where(count == 1, 1.0, np.where(count == 0, 0.0, self.best_weight - (1 - self.best_weight)
+                                                              / others))
+        self.total_factor = np.where(count > 1, (1 - self.best_weight) / others, 0.0)
+        self.regions = self.label_regions()
+        self.connected = self.connected_to_food()
+        self.fixed = self.walls | self.food | ~self.connected
+        self.set_values(self.open, 0.0)
+        self.set_values(self.food, 1.0)
+        self.set_values(self.open & ~self.connected, self.unreachable_value)
+        self.active = ~self.fixed
+
+    @staticmethod
+    def neighbors(padded):
+        """ The four neighbors of every cell (north, south, east, west) as views on a padded array. """
+        return padded[1:-1, :-2], padded[1:-1, 2:], padded[2:, 1:-1], padded[:-2, 1:-1]
+
+    def dilate(self, mask):
+        """ The cells next to a cell of the mask. """
+        width, height = mask.shape
+        padded = np.zeros((width + 2, height + 2), dtype=bool)
+        padded[1:-1, 1:-1] = mask
+        north, south, east, west = self.neighbors(padded)
+        return north | south | east | west
+
+    def label_regions(self):
+        """ Numbers the regions of open cells that are connected to each other, walls get 0. """
+        width, height = self.walls.shape
+        open = self.open.tolist()
+        labels = [[0] * height for x in range(width)]
+        label = 0
+        for x in range(width):
+            for y in range(height):
+                if open[x][y] and labels[x][y] == 0:
+                    label += 1
+                    labels[x][y] = label
+                    stack = [(x, y)]
+                    while len(stack) > 0:
+                        c_x, c_y = stack.pop()
+                        for n_x, n_y in ((c_x, c_y - 1), (c_x, c_y + 1), (c_x + 1, c_y), (c_x - 1, c_y)):
+                            if 0 <= n_x < width and 0 <= n_y < height and open[n_x][n_y] and labels[n_x][n_y] == 0:
+                                labels[n_x][n_y] = label
+                                stack.append((n_x, n_y))
+        return np.array(labels, dtype=int).reshape(width, height)
+
+    def connected_to_food(self):
+        """ The open cells from which food can be reached. """
+        return np.isin(self.regions, self.regions[self.food]) & self.open
+
+    def set_values(self, mask, value):
+        self.values[mask] = value
+        self.padded_max[1:-1, 1:-1][mask] = value
+
+    def set_food(self, food):
+        """
+        Changes the food on the board while keeping the values of the previous solve. The cells around the changed
+        food blocks become active, as do the cells of regions that got connected to food.
+        """
+        changed = food != self.food
+        if not changed.any():
+            return
+        self.food = food
+        was_connected = self.connected
+        self.connected = self.connected_to_food()
+        self.fixed = self.walls | self.food | ~self.connected
+        newly_connected = self.connected & ~was_connected & ~self.food
+        self.set_values(newly_connected, 0.0)
+        self.set_values(self.food, 1.0)
+        self.set_values(self.open & ~self.connected, self.unreachable_value)
+        self.active = (self.active | changed | self.dilate(changed) | newly_connected) & ~self.fixed
+
+    def sweep(self, cells=None):
+        """
+        Computes new values for the given cells from the current values of their neighbors.
+
+        :param cells: Boolean mask of the cells to update, None for all cells that are not fixed.
+
+        :return: Boolean mask of the cells whose value changed more than the tolerance.
+        """
+        if cells is None:
+            cells = ~self.fixed
+        rows = np.flatnonzero(cells.any(axis=1))
+        changed = np.zeros(cells.shape, dtype=bool)
+        if rows.size == 0:
+            return changed
+        columns = np.flatnonzero(cells.any(axis=0))
+        # only the smallest window holding all cells is computed
+        x0, x1, y0, y1 = rows[0], rows[-1] + 1, columns[0], columns[-1] + 1
+        north, south, east, west = self.neighbors(self.padded_sum[x0:x1 + 2, y0:y1 + 2])
+        total = north + south + east + west
+        north, south, east, west = self.neighbors(self.padded_max[x0:x1 + 2, y0:y1 + 2])
+        best = np.maximum(np.maximum(north, south), np.maximum(east, west))
+        new = best * self.best_factor[x0:x1, y0:y1] + total * self.total_factor[x0:x1, y0:y1] + self.step_reward
+        window = cells[x0:x1, y0:y1]
+        old = self.values[x0:x1, y0:y1]
+        changed[x0:x1, y0:y1] = (np.abs(new - old) > self.tolerance) & window
+        np.copyto(old, new, where=window)
+        np.copyto(self.padded_max[x0 + 1:x1 + 1, y0 + 1:y1 + 1], new, where=window)
+        return changed
+
+    def solve(self, deadline=None):
+        """
+        Sweeps the active cells until no value changes more than the tolerance, max_sweeps is reached or the deadline
+        has passed. Cells that are still active then are picked up by the next solve.
+
+        :param deadline: time.perf_counter() value after which no new sweep is started, None for no deadline.
+
+        :return: The number of sweeps done.
+        """
+        sweeps = 0
+        while sweeps < self.max_sweeps and self.active.any():
+            changed = self.sweep(self.active)
+            self.active = self.dilate(changed) & ~self.fixed
+            sweeps += 1
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+        return sweeps